@@ -1,4 +1,4 @@
 # Anki Jisho Import Add-on
 # Automatically fills Japanese word information using Jisho.org API
 
-from . import main
\ No newline at end of file
+from . import main, batch
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Pronunciation audio for looked-up words
+Produces audio from a pluggable source (a local TTS command or an HTTP
+endpoint), stores it in the media folder under a name derived from the
+source and the reading, and makes sure every reading is generated once
+"""
+
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+try:
+    from .lookup import SingleFlight
+except ImportError:
+    from lookup import SingleFlight
+
+# Offline text-to-speech commands used when audio.tts_command is empty.
+# {output} is replaced with the file to write; without a {text}
+# placeholder the text is passed on standard input.
+DEFAULT_TTS_COMMANDS = {
+    'darwin': [
+        'say', '-v', 'Kyoko', '-o', '{output}',
+        '--file-format=WAVE', '--data-format=LEI16@22050', '{text}',
+    ],
+    'win32': [
+        'powershell', '-NoProfile', '-Command',
+        "[Console]::InputEncoding = [Text.Encoding]::UTF8; "
+        "Add-Type -AssemblyName System.Speech; "
+        "$s = New-Object System.Speech.Synthesis.SpeechSynthesizer; "
+        "try { $s.SelectVoiceByHints('NotSet', 'NotSet', 0, [Globalization.CultureInfo]'ja-JP') } catch {}; "
+        "$s.SetOutputToWaveFile('{output}'); $s.Speak([Console]::In.ReadToEnd())",
+    ],
+    'linux': ['espeak-ng', '-v', 'ja', '-w', '{output}', '{text}'],
+}
+
+
+class AudioError(Exception):
+    """Raised when a source cannot produce audio for a word"""
+
+
+class AudioSource:
+    """Base class for audio sources"""
+
+    extension = 'wav'
+
+    def key(self):
+        """Identity of the source; part of every file name it produces"""
+        raise NotImplementedError
+
+    def fetch(self, text):
+        """Return the audio for text as bytes"""
+        raise NotImplementedError
+
+
+class CommandSource(AudioSource):
+    """Runs a local text-to-speech command"""
+
+    def __init__(self, command, extension='wav', timeout=30):
+        self.command = list(command)
+        self.extension = extension
+        self.timeout = timeout
+
+    @classmethod
+    def default_command(cls):
+        return DEFAULT_TTS_COMMANDS.get(sys.platform, DEFAULT_TTS_COMMANDS['linux'])
+
+    def key(self):
+        return '\x1f'.join(self.command)
+
+    def fetch(self, text):
+        with tempfile.TemporaryDirectory(prefix='jisho-audio-') as directory:
+            output = os.path.join(directory, f"audio.{self.extension}")
+            args = [arg.replace('{output}', output).replace('{text}', text) for arg in self.command]
+            stdin = None if any('{text}' in arg for arg in self.command) else text.encode('utf-8')
+            try:
+                completed = subprocess.run(
+                    args, input=stdin, capture_output=True, timeout=self.timeout, check=True
+                )
+            except (OSError, subprocess.SubprocessError) as e:
+                raise AudioError(f"Text-to-speech command failed: {e}") from e
+
+            if any('{output}' in arg for arg in self.command):
+                try:
+                    with open(output, 'rb') as f:
+                        return f.read()
+                except OSError as e:
+                    raise AudioError(f"Text-to-speech command wrote no audio: {e}") from e
+            return completed.stdout
+
+
+class HttpSource(AudioSource):
+    """Downloads audio from a URL template such as https://example.com/tts?q={text}"""
+
+    def __init__(self, url_template, extension='mp3', timeout=10):
+        self.url_template = url_template
+        self.extension = extension
+        self.timeout = timeout
+        self._session = None
+
+    def key(self):
+        return self.url_template
+
+    def fetch(self, text):
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = "anki-jisho-import"
+        url = self.url_template.replace('{text}', quote(text))
+        try:
+            response = self._session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise AudioError(f"Audio download failed: {e}") from e
+        return response.content
+
+
+def create_audio_source(config):
+    """Build the audio source selected under "audio" in config.json"""
+    audio = config.get("audio", {})
+    if audio.get("source", "tts") == "http":
+        if not audio.get("http_url"):
+            raise AudioError('audio.http_url must be set when audio.source is "http"')
+        return HttpSource(audio["http_url"], extension=audio.get("extension") or 'mp3')
+    return CommandSource(
+        audio.get("tts_command") or CommandSource.default_command(),
+        extension=audio.get("extension") or 'wav',
+    )
+
+
+def audio_text(data):
+    """The text to pronounce for a parsed result"""
+    return data.get('reading') or data.get('kanji', '')
+
+
+def sound_tag(filename):
+    return f"[sound:{filename}]"
+
+
+def with_audio(pipeline, data):
+    """Return data (a dict or any mapping) as a dict with an "audio" sound tag
+
+    Per-token results and results without a reading are returned unchanged.
+    Errors from the audio source are raised.
+    """
+    if not data or 'tokens' in data:
+        return data
+    text = audio_text(data)
+    if not text:
+        return data
+    return dict(data, audio=sound_tag(pipeline.ensure(text)))
+
+
+class AudioPipeline:
+    """Generates audio into a media folder with a bounded worker pool
+
+    Files are named after a hash of the source and the text, so a reading
+    that already has a file is never generated again, and concurrent
+    requests for the same reading share one generation. write(name, data)
+    stores a file and returns the name it was stored under; inside Anki
+    this is the collection's media manager, so new files are registered.
+    Without it files are written straight into media_dir (tests, scripts).
+    """
+
+    def __init__(self, source, media_dir, max_workers=2, write=None):
+        self.source = source
+        self.media_dir = media_dir
+        self.max_workers = max_workers
+        self.write = write
+        self.generated = 0
+        self.flights = SingleFlight()
+        self._pool = None
+
+    def filename(self, text):
+        digest = hashlib.sha1(f"{self.source.key()}\x1e{text}".encode('utf-8')).hexdigest()
+        return f"jisho_{digest[:20]}.{self.source.extension}"
+
+    def ensure(self, text):
+        """Return the media file name for text, generating the file if needed"""
+        name = self.filename(text)
+        if os.path.exists(os.path.join(self.media_dir, name)):
+            return name
+        return self.flights.do(name, lambda: self._generate(text, name))
+
+    def _generate(self, text, name):
+        path = os.path.join(self.media_dir, name)
+        # Another thread may have finished this file after the existence check
+        if os.path.exists(path):
+            return name
+        data = self.source.fetch(text)
+        if not data:
+            raise AudioError(f"No audio produced for {text}")
+        if self.write is not None:
+            name = self.write(name, data)
+        else:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self.generated += 1
+        return name
+
+    def submit(self, text):
+        """Generate audio on the worker pool and return a Future of the file name"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='jisho-audio')
+        return self._pool.submit(self.ensure, text)
+
+    def ensure_many(self, texts, progress=None):
+        """Generate audio for many texts on the worker pool
+
+        Each distinct text is generated once. progress(done, total) is
+        called after every finished text.
+        Returns ({text: file name}, number of failures).
+        """
+        futures = {self.submit(text): text for text in set(texts) if text}
+        files = {}
+        failures = 0
+        for done, future in enumerate(as_completed(futures), 1):
+            text = futures[future]
+            try:
+                files[text] = future.result()
+            except Exception as e:
+                print(f"Error generating audio for {text}: {e}")
+                failures += 1
+            if progress:
+                progress(done, len(futures))
+        return files, failures
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
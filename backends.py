@@ -0,0 +1,72 @@
+"""
+Dictionary backends used for word lookups
+Every backend returns results in the dict shape produced by parse_jisho_result
+"""
+
+import os
+
+try:
+    from .jisho_parser import JishoEntry, parse_jisho_result
+    from .stats import stats
+except ImportError:
+    from jisho_parser import JishoEntry, parse_jisho_result
+    from stats import stats
+
+
+class LookupBackend:
+    """Interface for dictionary backends"""
+
+    # Whether results should be kept in the lookup cache
+    uses_cache = False
+
+    def lookup(self, word):
+        """Return (result, raw_entries) for a word; result is None if nothing was found"""
+        raise NotImplementedError
+
+    def search(self, word, page=1):
+        """Return one page of candidate results, best match first"""
+        result, _ = self.lookup(word)
+        return [result] if result and page == 1 else []
+
+    def close(self):
+        """Release any resources held by the backend"""
+
+
+class JishoApiBackend(LookupBackend):
+    """Looks words up on the live Jisho.org API"""
+
+    uses_cache = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def lookup(self, word):
+        data = self.client.search(word)
+        entries = data.get('data') or []
+
+        # Get the first result (most relevant)
+        with stats.timer('parse'):
+            result = parse_jisho_result(entries[0]) if entries else None
+        return result, entries
+
+    def search(self, word, page=1):
+        data = self.client.search(word, page)
+        return [JishoEntry(entry) for entry in data.get('data') or []]
+
+
+def create_backend(config, client_factory, base_dir):
+    """Build the backend selected by the "backend" config option"""
+    name = config.get("backend", "jisho")
+    if name == "jmdict":
+        try:
+            from .jmdict import JMdictBackend
+        except ImportError:
+            from jmdict import JMdictBackend
+        path = config.get("jmdict_db", "user_files/jmdict.sqlite3")
+        try:
+            return JMdictBackend(os.path.join(base_dir, path))
+        except FileNotFoundError as e:
+            print(f"{e}, falling back to Jisho.org")
+    elif name != "jisho":
+        print(f"Unknown backend '{name}', falling back to Jisho.org")
+    return JishoApiBackend(client_factory())
@@ -0,0 +1,367 @@
+"""
+Batch operations over many notes
+Fills selected notes from the Browser with concurrent lookups, skipping
+notes unchanged since their last fill, and tags whole decks by JLPT
+level and commonness from local data; each run is one undo step
+"""
+
+import os
+import time
+
+from aqt import mw, gui_hooks
+from aqt.operations import CollectionOp, QueryOp
+from aqt.qt import *
+from aqt.utils import showInfo, tooltip
+
+from .field_resolver import resolver
+from .main import (
+    ADDON_DIR, apply_data_to_note, get_audio_pipeline, get_importer, get_lookup_cache, load_config,
+)
+
+_fill_index = None
+
+
+def get_fill_index(config):
+    """Return the shared index of already filled notes"""
+    global _fill_index
+    if _fill_index is None:
+        from .fill_index import FillIndex
+        _fill_index = FillIndex(
+            os.path.join(ADDON_DIR, 'user_files', 'fill_index.sqlite3'),
+            max_age_days=config.get("cache", {}).get("ttl_days", 30),
+        )
+    return _fill_index
+
+
+def reset_fill_index():
+    """Close the index so the next batch fill picks up new settings"""
+    global _fill_index
+    if _fill_index is not None:
+        _fill_index.close()
+        _fill_index = None
+
+
+def note_state(note, field_mappings):
+    """Return (keyword, fingerprint) of a note, or None if it has no Japanese word"""
+    from .fill_index import note_fingerprint
+    index = resolver.field_index(note, "Japanese")
+    if index is None:
+        return None
+    word = note.fields[index].strip()
+    if not word:
+        return None
+    return word, note_fingerprint(note.fields, resolver.resolve_note(note, field_mappings))
+
+
+def collect_keywords(col, note_ids, field_mappings, known, skip_complete=True):
+    """Load the selected notes and group them by their Japanese field keyword
+
+    Notes whose keyword and mapped fields match a fresh entry in known
+    ({note id: (keyword, fingerprint, result hash, fresh)}) are skipped.
+    """
+    from .lookup_cache import normalize_keyword
+    notes = {}
+    keywords = {}
+    skipped = 0
+    for nid in note_ids:
+        note = col.get_note(nid)
+        state = note_state(note, field_mappings)
+        if state is None:
+            continue
+        word, fingerprint = state
+        key = normalize_keyword(word)
+        entry = known.get(nid)
+        if skip_complete and entry and entry[3] and entry[:2] == (key, fingerprint):
+            skipped += 1
+            continue
+        notes[nid] = (note, fingerprint)
+        keywords.setdefault(key, (word, []))[1].append(nid)
+    return notes, keywords, skipped
+
+
+def lookup_keywords(importer, keywords, max_workers, audio=None):
+    """Resolve keywords through a bounded thread pool, reporting progress on the main thread
+
+    Results are kept in a compact ResultStore rather than one dict per
+    word. With an audio pipeline, audio for each found word starts
+    generating on the pipeline's workers as soon as its lookup finishes.
+    """
+    from .audio import audio_text
+    from .lookup import lookup_many
+    from .result_store import ResultStore
+    from .scheduler import BULK, new_job, priority
+
+    store = ResultStore()
+    # Runs at bulk priority so that Ctrl+J lookups are served first
+    job = new_job('batch-fill')
+
+    def progress(done, total, rate):
+        label = f"Looked up {done}/{total} words ({rate:.1f}/s)"
+        mw.taskman.run_on_main(
+            lambda: mw.progress.update(label=label, value=done, max=total)
+        )
+
+    def lookup(word):
+        with priority(BULK, job):
+            result = importer.lookup(word)
+        if not result:
+            return None
+        text = audio_text(result) if audio is not None else None
+        if text:
+            audio.submit(text)
+        return store.add(result)
+
+    words = {key: word for key, (word, _) in keywords.items()}
+    return lookup_many(lookup, words, max_workers, progress)
+
+
+def add_audio(audio, results):
+    """Wait for the audio of every found word and add its sound tag to the results
+
+    Returns the updated results and the number of words without audio.
+    """
+    from .audio import audio_text, sound_tag
+
+    def progress(done, total):
+        label = f"Generated audio {done}/{total}"
+        mw.taskman.run_on_main(
+            lambda: mw.progress.update(label=label, value=done, max=total)
+        )
+
+    texts = {key: audio_text(data) for key, data in results.items() if data}
+    # Readings already generated (or in flight) since the lookups are only waited for
+    files, failures = audio.ensure_many(texts.values(), progress)
+    updated = dict(results)
+    for key, text in texts.items():
+        if text in files:
+            updated[key] = dict(results[key], audio=sound_tag(files[text]))
+    return updated, failures
+
+
+def batch_fill_notes(browser):
+    """Fill all selected notes from Jisho.org without blocking the UI"""
+    note_ids = browser.selected_notes()
+    if not note_ids:
+        tooltip("No notes selected")
+        return
+
+    from .fill_index import result_hash
+    from .lookup_cache import normalize_keyword
+
+    importer = get_importer()
+    config = importer.config
+    field_mappings = config.get("field_mappings", {})
+    max_workers = config.get("batch", {}).get("max_workers", 4)
+    skip_complete = config.get("batch", {}).get("skip_complete", True)
+    fill_index = get_fill_index(config)
+
+    def op(col):
+        started = time.time()
+        known = fill_index.load(note_ids)
+        notes, keywords, skipped = collect_keywords(col, note_ids, field_mappings, known, skip_complete)
+        audio = get_audio_pipeline(config)
+        results, failures = lookup_keywords(importer, keywords, max_workers, audio)
+        audio_failures = 0
+        if audio is not None:
+            results, audio_failures = add_audio(audio, results)
+
+        changed = []
+        filled = []
+        for key, data in results.items():
+            hashed = result_hash(data)
+            for nid in keywords[key][1]:
+                note, fingerprint = notes[nid]
+                note_key = key
+                # A stale entry whose note and dictionary data are both unchanged needs no write
+                unchanged = known.get(nid, ())[:3] == (key, fingerprint, hashed)
+                if data and not unchanged and apply_data_to_note(note, data, field_mappings):
+                    changed.append(note)
+                    word, fingerprint = note_state(note, field_mappings)
+                    note_key = normalize_keyword(word)
+                filled.append((nid, note_key, fingerprint, hashed))
+
+        return {
+            'changed': changed,
+            'filled': filled,
+            'skipped': skipped,
+            'keywords': len(keywords),
+            'failures': failures,
+            'audio_failures': audio_failures,
+            'missing': sum(1 for data in results.values() if not data),
+            'elapsed': time.time() - started,
+        }
+
+    def on_success(summary):
+        write_results(browser, summary)
+
+    QueryOp(parent=browser, op=op, success=on_success).with_progress(
+        "Looking up words on Jisho.org..."
+    ).run_in_background()
+
+
+def write_results(browser, summary):
+    """Save the filled notes as a single undo step"""
+    changed = summary['changed']
+    fill_index = get_fill_index(get_importer().config)
+
+    def op(col):
+        pos = col.add_custom_undo_entry("Jisho Batch Fill")
+        col.update_notes(changed)
+        return col.merge_undo_entries(pos)
+
+    def on_success(_changes):
+        # Only remember notes once their new contents are saved
+        fill_index.record(summary['filled'])
+        rate = summary['keywords'] / max(summary['elapsed'], 1e-6)
+        message = (
+            f"Updated {len(changed)} notes from {summary['keywords']} unique words "
+            f"in {summary['elapsed']:.1f}s ({rate:.1f} words/s)."
+        )
+        if summary['skipped']:
+            message += f"\nSkipped {summary['skipped']} notes unchanged since the last fill."
+        if summary['missing']:
+            message += f"\nNo results for {summary['missing']} words."
+        if summary['failures']:
+            message += f"\n{summary['failures']} lookups failed."
+        if summary['audio_failures']:
+            message += f"\nNo audio for {summary['audio_failures']} words."
+        showInfo(message, parent=browser)
+
+    if not changed:
+        on_success(None)
+        return
+
+    CollectionOp(parent=browser, op=op).success(on_success).run_in_background()
+
+
+def open_offline_dictionary(config):
+    """Open the JMdict index if it has been built, else return None"""
+    jmdict_path = os.path.join(ADDON_DIR, config.get("jmdict_db", "user_files/jmdict.sqlite3"))
+    if not os.path.exists(jmdict_path):
+        return None
+    from .jmdict import JMdictBackend
+    return JMdictBackend(jmdict_path)
+
+
+def plan_deck_tags(col, deck_name, config):
+    """Work out the tag and field changes for every note in a deck without saving them"""
+    from anki.collection import SearchNode
+    from .lookup_cache import normalize_keyword
+    from .word_attributes import resolve_attributes, update_tags
+
+    started = time.time()
+    field_mappings = config.get("field_mappings", {})
+    tagging = config.get("tagging", {})
+    prefix = tagging.get("jlpt_prefix", "JLPT::")
+    common_tag = tagging.get("common_tag", "common")
+
+    note_ids = col.find_notes(col.build_search_string(SearchNode(deck=deck_name)))
+    notes = {}
+    for nid in note_ids:
+        note = col.get_note(nid)
+        index = resolver.field_index(note, "Japanese")
+        word = note.fields[index].strip() if index is not None else ''
+        if word:
+            notes.setdefault(normalize_keyword(word), []).append(note)
+
+    # One pass over local data resolves every distinct word in the deck;
+    # the lookup cache has JLPT levels, the offline dictionary fills in the rest
+    jmdict = open_offline_dictionary(config)
+    sources = [source for source in (get_lookup_cache(config), jmdict) if source is not None]
+    try:
+        attributes = resolve_attributes(notes.keys(), sources)
+    finally:
+        if jmdict is not None:
+            jmdict.close()
+
+    changed = []
+    for key, (jlpt, common) in attributes.items():
+        data = {'jlpt': jlpt, 'common': 'Yes' if common else 'No'}
+        for note in notes[key]:
+            fields_changed = apply_data_to_note(note, data, field_mappings)
+            tags = update_tags(note.tags, jlpt, common, prefix, common_tag)
+            if tags is not None:
+                note.tags = tags
+            if fields_changed or tags is not None:
+                changed.append(note)
+
+    return {
+        'deck': deck_name,
+        'changed': changed,
+        'notes': len(note_ids),
+        'unknown': sum(len(group) for key, group in notes.items() if key not in attributes),
+        'elapsed': time.time() - started,
+    }
+
+
+def write_deck_tags(summary, chunk_size):
+    """Save the tagged notes in chunks as a single undo step"""
+    changed = summary['changed']
+
+    def op(col):
+        pos = col.add_custom_undo_entry("Jisho Deck Tagging")
+        for start in range(0, len(changed), chunk_size):
+            col.update_notes(changed[start:start + chunk_size])
+            done = min(start + chunk_size, len(changed))
+            mw.taskman.run_on_main(
+                lambda done=done: mw.progress.update(
+                    label=f"Saved {done}/{len(changed)} notes", value=done, max=len(changed)
+                )
+            )
+        return col.merge_undo_entries(pos)
+
+    def on_success(_changes):
+        message = (
+            f"Tagged {len(changed)} of {summary['notes']} notes in {summary['deck']} "
+            f"in {summary['elapsed']:.1f}s."
+        )
+        if summary['unknown']:
+            message += (
+                f"\n{summary['unknown']} notes have words not found in the lookup cache "
+                "or offline dictionary; fill them from the Browser first."
+            )
+        showInfo(message)
+
+    if not changed:
+        on_success(None)
+        return
+
+    CollectionOp(parent=mw, op=op).success(on_success).run_in_background()
+
+
+def tag_deck():
+    """Tag every note of a chosen deck with its JLPT level and commonness"""
+    names = sorted(deck.name for deck in mw.col.decks.all_names_and_ids())
+    deck_name, ok = QInputDialog.getItem(
+        mw, "Jisho: Tag Deck", "Tag notes in deck by JLPT level and commonness:", names, 0, False
+    )
+    if not ok or not deck_name:
+        return
+
+    config = load_config()
+    chunk_size = max(config.get("tagging", {}).get("chunk_size", 1000), 1)
+    QueryOp(
+        parent=mw,
+        op=lambda col: plan_deck_tags(col, deck_name, config),
+        success=lambda summary: write_deck_tags(summary, chunk_size),
+    ).with_progress("Tagging notes from local dictionary data...").run_in_background()
+
+
+def setup_tools_menu():
+    """Add the deck tagging action to the Tools menu"""
+    action = QAction("Jisho: Tag Deck by JLPT/Common...", mw)
+    action.triggered.connect(tag_deck)
+    mw.form.menuTools.addAction(action)
+
+
+def setup_browser_menu(browser):
+    """Add the batch fill action to the Browser's Notes menu"""
+    action = QAction("Fill from Jisho.org", browser)
+    action.setShortcut(QKeySequence("Ctrl+Shift+J"))
+    action.triggered.connect(lambda: batch_fill_notes(browser))
+    browser.form.menu_Notes.addSeparator()
+    browser.form.menu_Notes.addAction(action)
+
+
+gui_hooks.browser_menus_did_init.append(setup_browser_menu)
+gui_hooks.main_window_did_init.append(setup_tools_menu)
@@ -0,0 +1,259 @@
+"""
+Configuration service for the add-on
+Parses config.json once, validates it and hands out a shared read-only
+snapshot that is refreshed only when the file changes
+"""
+
+import copy
+import json
+import os
+import threading
+from types import MappingProxyType
+
+try:
+    from .stats import stats
+except ImportError:
+    from stats import stats
+
+
+DEFAULT_CONFIG = {
+    "field_mappings": {
+        "Japanese": "kanji",
+        "Reading": "reading",
+        "Meaning": "meanings",
+        "JLPT": "jlpt",
+        "PartOfSpeech": "pos",
+        "Common": "common",
+        "Audio": "audio"
+    },
+    "keyboard_shortcut": "Ctrl+J",
+    "backend": "jisho",
+    "jmdict_db": "user_files/jmdict.sqlite3",
+    "cache": {
+        "enabled": True,
+        "ttl_days": 30,
+        "max_entries": 50000
+    },
+    "batch": {
+        "max_workers": 4,
+        "skip_complete": True
+    },
+    "tagging": {
+        "jlpt_prefix": "JLPT::",
+        "common_tag": "common",
+        "chunk_size": 1000
+    },
+    "prefetch": {
+        "enabled": False,
+        "delay_ms": 300
+    },
+    "stats": {
+        "enabled": False
+    },
+    "audio": {
+        "enabled": False,
+        "source": "tts",
+        "tts_command": [],
+        "http_url": "",
+        "extension": "",
+        "max_workers": 2
+    },
+    "tokenizer": {
+        "enabled": False,
+        "analyzer": "auto",
+        "max_workers": 8,
+        "separator": "<br>",
+        "field_mappings": {
+            "Tokens": "tokens",
+            "TokenReadings": "token_readings",
+            "TokenMeanings": "token_meanings"
+        }
+    },
+    "scheduler": {
+        "interactive_reserve": 2,
+        "fairness": "round_robin"
+    },
+    "http": {
+        "pool_size": 4,
+        "timeout": 10,
+        "max_retries": 3,
+        "backoff_base": 0.5,
+        "rate_limit_per_sec": 5,
+        "rate_limit_burst": 10,
+        "breaker_threshold": 5,
+        "breaker_cooldown": 30
+    }
+}
+
+NUMBER = (int, float)
+
+
+class OneOf:
+    """Schema entry for a string restricted to a fixed set of values"""
+
+    def __init__(self, *values):
+        self.values = values
+
+# Expected type for every known key; nested dicts describe config sections
+SCHEMA = {
+    "field_mappings": dict,
+    "keyboard_shortcut": str,
+    "backend": OneOf("jisho", "jmdict"),
+    "jmdict_db": str,
+    "cache": {
+        "enabled": bool,
+        "ttl_days": NUMBER,
+        "max_entries": int
+    },
+    "batch": {
+        "max_workers": int,
+        "skip_complete": bool
+    },
+    "tagging": {
+        "jlpt_prefix": str,
+        "common_tag": str,
+        "chunk_size": int
+    },
+    "prefetch": {
+        "enabled": bool,
+        "delay_ms": NUMBER
+    },
+    "stats": {
+        "enabled": bool
+    },
+    "audio": {
+        "enabled": bool,
+        "source": OneOf("tts", "http"),
+        "tts_command": list,
+        "http_url": str,
+        "extension": str,
+        "max_workers": int
+    },
+    "tokenizer": {
+        "enabled": bool,
+        "analyzer": OneOf("auto", "sudachi", "fugashi", "simple"),
+        "max_workers": int,
+        "separator": str,
+        "field_mappings": dict
+    },
+    "scheduler": {
+        "interactive_reserve": int,
+        "fairness": OneOf("round_robin", "fifo")
+    },
+    "http": {
+        "pool_size": int,
+        "timeout": NUMBER,
+        "max_retries": int,
+        "backoff_base": NUMBER,
+        "rate_limit_per_sec": NUMBER,
+        "rate_limit_burst": int,
+        "breaker_threshold": int,
+        "breaker_cooldown": NUMBER
+    }
+}
+
+
+def validate_config(config, defaults=DEFAULT_CONFIG, schema=SCHEMA, path=""):
+    """Merge a user config over the defaults, replacing invalid values
+
+    Returns the merged config and a list of problems found.
+    """
+    merged = copy.deepcopy(defaults)
+    problems = []
+    if not isinstance(config, dict):
+        return merged, [f"{path or 'config'} must be an object"]
+
+    for key, value in config.items():
+        expected = schema.get(key)
+        name = f"{path}{key}"
+        if expected is None:
+            # Unknown keys are kept so newer options survive older schemas
+            merged[key] = value
+        elif isinstance(expected, dict):
+            merged[key], nested = validate_config(value, defaults.get(key, {}), expected, name + ".")
+            problems.extend(nested)
+        elif isinstance(expected, OneOf):
+            if value in expected.values:
+                merged[key] = value
+            else:
+                problems.append(f"{name} must be one of {', '.join(expected.values)}")
+        elif isinstance(value, bool) and expected is not bool:
+            problems.append(f"{name} must not be true/false")
+        elif not isinstance(value, expected):
+            problems.append(f"{name} has the wrong type")
+        else:
+            merged[key] = value
+    return merged, problems
+
+
+def freeze(value):
+    """Return a read-only view of a parsed JSON value"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class ConfigStore:
+    """Caches the parsed config and reloads it when its files change
+
+    Anki keeps config edits made in its add-on config dialog under the
+    "config" key of meta.json, so that file is layered over config.json.
+    """
+
+    def __init__(self, path, meta_path=None):
+        self.path = path
+        self.meta_path = meta_path
+        self._snapshot = None
+        self._mtimes = None
+        self._lock = threading.Lock()
+
+    def _current_mtimes(self):
+        mtimes = []
+        for path in (self.path, self.meta_path):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns if path else None)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def get(self):
+        """Return the current read-only config snapshot"""
+        mtimes = self._current_mtimes()
+        if self._snapshot is None or mtimes != self._mtimes:
+            with self._lock:
+                if self._snapshot is None or mtimes != self._mtimes:
+                    with stats.timer('config_load'):
+                        self._snapshot = freeze(self._read())
+                    self._mtimes = mtimes
+        return self._snapshot
+
+    def invalidate(self):
+        """Force the next get() to re-read the config files"""
+        with self._lock:
+            self._snapshot = None
+
+    def _read(self):
+        """Parse and validate the config files, falling back to the defaults"""
+        config = self._load_json(self.path)
+        if self.meta_path:
+            overrides = self._load_json(self.meta_path).get("config")
+            if isinstance(overrides, dict):
+                config.update(overrides)
+
+        merged, problems = validate_config(config)
+        for problem in problems:
+            print(f"Invalid config: {problem}, using default")
+        return merged
+
+    @staticmethod
+    def _load_json(path):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                    return data if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"Could not load config: {e}")
+        return {}
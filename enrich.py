@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Command-line bulk enricher for vocabulary lists
+Streams a CSV/TSV/plain word list, looks every word up concurrently
+(through the same cache, rate limiter and backends as the add-on) and
+writes enriched rows as TSV or JSONL ready for Anki's importer
+
+Example:
+    python enrich.py words.txt enriched.tsv
+    python enrich.py vocab.csv enriched.jsonl --column Word --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import create_backend
+from config_store import ConfigStore
+from jisho_client import JishoClient
+import json_codec
+from jisho_parser import RESULT_KEYS
+from lookup import WordLookup
+from lookup_cache import LookupCache
+from scheduler import BULK, new_job, with_priority
+
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rows between checkpoint writes
+CHECKPOINT_EVERY = 200
+
+
+def detect_format(path, explicit=None):
+    """Pick the input/output format from an explicit option or the file extension"""
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    return {'.csv': 'csv', '.tsv': 'tsv', '.jsonl': 'jsonl'}.get(extension, 'txt')
+
+
+def read_words(f, input_format, column):
+    """Yield (row, word) pairs from an open input file, one line at a time"""
+    if input_format == 'txt':
+        for line in f:
+            word = line.strip()
+            yield [word], word
+        return
+
+    reader = csv.reader(f, delimiter='\t' if input_format == 'tsv' else ',')
+    index = 0
+    if column is not None:
+        if column.isdigit():
+            index = int(column)
+        else:
+            header = next(reader, [])
+            yield None, None  # the header row counts as consumed input
+            index = header.index(column)
+    for row in reader:
+        yield row, (row[index].strip() if index < len(row) else '')
+
+
+def format_row(output_format, row, result):
+    """Render one enriched row"""
+    result = result or {}
+    if output_format == 'jsonl':
+        record = {'input': row}
+        record.update({key: result.get(key, '') for key in RESULT_KEYS})
+        return json_codec.dumps(record) + '\n'
+    values = list(row) + [result.get(key, '') for key in RESULT_KEYS]
+    return '\t'.join(value.replace('\t', ' ').replace('\n', ' ') for value in values) + '\n'
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, rows, offset):
+    """Atomically record how much input has been written out"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'rows': rows, 'offset': offset}, f)
+    os.replace(tmp_path, path)
+
+
+def enrich(args):
+    config = ConfigStore(os.path.join(ADDON_DIR, 'config.json')).get()
+    cache = None
+    if not args.no_cache and config['cache'].get('enabled', True):
+        cache = LookupCache(
+            args.cache or os.path.join(ADDON_DIR, 'user_files', 'lookup_cache.sqlite3'),
+            ttl_days=config['cache'].get('ttl_days', 30),
+            max_entries=config['cache'].get('max_entries', 50000),
+        )
+    backend_config = dict(config)
+    if args.backend:
+        backend_config['backend'] = args.backend
+    backend = create_backend(backend_config, lambda: JishoClient.from_config(config), ADDON_DIR)
+    lookups = WordLookup(backend, cache)
+
+    input_format = detect_format(args.input, args.input_format)
+    output_format = detect_format(args.output, args.output_format)
+    if output_format not in ('tsv', 'jsonl'):
+        output_format = 'tsv'
+
+    # Resume after the last checkpointed row, dropping any partial output
+    checkpoint_path = args.output + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    skip_rows = checkpoint['rows'] if checkpoint else 0
+    out = open(args.output, 'r+' if checkpoint else 'w', encoding='utf-8', newline='')
+    if checkpoint:
+        out.seek(checkpoint['offset'])
+        out.truncate()
+
+    workers = args.workers or config['batch'].get('max_workers', 4)
+    window = deque()
+    rows_done = skip_rows
+    since_checkpoint = 0
+    looked_up = 0
+    started = time.time()
+
+    def write_finished(keep):
+        """Write out completed lookups in input order, waiting while more than keep are pending"""
+        nonlocal rows_done, since_checkpoint, looked_up
+        while len(window) > keep or (window and (window[0][1] is None or window[0][1].done())):
+            row, future = window.popleft()
+            result = None
+            if future is not None:
+                looked_up += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"\nError looking up {row}: {e}", file=sys.stderr)
+            if row is not None:
+                out.write(format_row(output_format, row, result))
+            rows_done += 1
+            since_checkpoint += 1
+            if since_checkpoint >= CHECKPOINT_EVERY:
+                out.flush()
+                save_checkpoint(checkpoint_path, rows_done, out.tell())
+                since_checkpoint = 0
+                rate = looked_up / max(time.time() - started, 1e-6)
+                print(f"\r{rows_done} rows ({rate:.1f} rows/s)", end='', file=sys.stderr)
+
+    # Bound the number of rows held in memory
+    max_pending = workers * 4
+    lookup = with_priority(lookups.lookup, BULK, new_job('enrich'))
+    with open(args.input, encoding='utf-8-sig', newline='') as f, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        for number, (row, word) in enumerate(read_words(f, input_format, args.column)):
+            if number < skip_rows:
+                continue
+            future = pool.submit(lookup, word) if word else None
+            window.append((row, future))
+            write_finished(keep=max_pending)
+        write_finished(keep=0)
+
+    out.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    if cache:
+        cache.close()
+
+    elapsed = time.time() - started
+    print(
+        f"\rEnriched {rows_done - skip_rows} rows in {elapsed:.1f}s "
+        f"({looked_up / max(elapsed, 1e-6):.1f} rows/s)",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich a Japanese vocabulary list from Jisho.org")
+    parser.add_argument('input', help="CSV, TSV or plain text file with one word per line")
+    parser.add_argument('output', help="output file (.tsv or .jsonl)")
+    parser.add_argument('--column', help="column name or index holding the word (CSV/TSV input)")
+    parser.add_argument('--input-format', choices=['txt', 'csv', 'tsv'])
+    parser.add_argument('--output-format', choices=['tsv', 'jsonl'])
+    parser.add_argument('--workers', type=int, help="concurrent lookups (default: batch.max_workers)")
+    parser.add_argument('--backend', choices=['jisho', 'jmdict'], help="override the configured backend")
+    parser.add_argument('--cache', help="lookup cache file (default: the add-on's cache)")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the lookup cache")
+    parser.add_argument('--resume', action='store_true', help="continue from the last checkpoint")
+    enrich(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
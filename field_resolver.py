@@ -0,0 +1,104 @@
+"""
+Field name resolution for note types
+Maps config field names (e.g. "Reading") onto the fields of a note type,
+compiling the mapping once per note type and caching it
+"""
+
+import threading
+
+
+# Alternative field names accepted for each config field
+FIELD_VARIATIONS = {
+    'japanese': ['japanese', 'word', 'kanji', 'japanese_word'],
+    'reading': ['reading', 'kana', 'hiragana', 'pronunciation', 'furigana'],
+    'meaning': ['meaning', 'definition', 'english', 'translation', 'definitions'],
+    'jlpt': ['jlpt', 'jlpt_level', 'level', 'jlptlevel'],
+    'partofspeech': ['partofspeech', 'pos', 'grammar', 'type', 'part_of_speech'],
+    'common': ['common', 'frequency', 'popular', 'commonness'],
+    'audio': ['audio', 'sound', 'voice', 'word_audio']
+}
+
+
+def _squash(name):
+    """Lower-case a field name and drop separators for fuzzy comparison"""
+    return name.lower().replace('_', '').replace(' ', '')
+
+
+# Variants are compared against squashed field names, so squash them once up front
+_SQUASHED_VARIATIONS = {
+    key: [_squash(variant) for variant in variants]
+    for key, variants in FIELD_VARIATIONS.items()
+}
+
+
+def find_field_index(field_name, available_fields):
+    """Return the index of the field matching field_name, or None"""
+    # Try exact match first (case-insensitive)
+    wanted = field_name.lower()
+    for index, fname in enumerate(available_fields):
+        if fname.lower() == wanted:
+            return index
+
+    # If no exact match, try fuzzy matching
+    variants = _SQUASHED_VARIATIONS.get(_squash(field_name))
+    if variants:
+        squashed = [_squash(fname) for fname in available_fields]
+        for variant in variants:
+            for index, fname in enumerate(squashed):
+                if variant in fname:
+                    return index
+
+    return None
+
+
+def find_matching_field(field_name, available_fields):
+    """Find matching field using fuzzy matching"""
+    index = find_field_index(field_name, available_fields)
+    return available_fields[index] if index is not None else None
+
+
+class FieldResolver:
+    """Caches config field -> field index tables per note type
+
+    Tables are keyed by note type id and modification time, so editing a
+    note type (renaming or reordering fields) recompiles its table.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, notetype, field_names):
+        """Return {config field: field index} for the given config field names"""
+        field_names = tuple(field_names)
+        key = (notetype['id'], notetype.get('mod', 0), field_names)
+        table = self._tables.get(key)
+        if table is None:
+            available = [field['name'] for field in notetype['flds']]
+            table = {}
+            for field_name in field_names:
+                index = find_field_index(field_name, available)
+                if index is not None:
+                    table[field_name] = index
+            with self._lock:
+                # Drop tables compiled for older versions of this note type
+                for stale in [k for k in self._tables if k[0] == key[0] and k[1] != key[1]]:
+                    del self._tables[stale]
+                self._tables[key] = table
+        return table
+
+    def resolve_note(self, note, field_names):
+        """Resolve config field names against a note's note type"""
+        return self.resolve(note.note_type(), field_names)
+
+    def field_index(self, note, field_name):
+        """Return the index of one config field in a note, or None"""
+        return self.resolve_note(note, (field_name,)).get(field_name)
+
+    def clear(self):
+        """Forget all compiled tables"""
+        with self._lock:
+            self._tables.clear()
+
+
+resolver = FieldResolver()
@@ -0,0 +1,111 @@
+"""
+Sidecar index of notes already filled by the batch fill
+Remembers each note's keyword, a fingerprint of its mapped fields and
+a hash of the result written into it, so re-runs can skip notes that
+have not changed since without a lookup or a write
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from . import json_codec
+except ImportError:
+    import json_codec
+
+
+def note_fingerprint(fields, table):
+    """Hash the values of the mapped fields ({field name: index}) of a note"""
+    digest = hashlib.sha1()
+    for name in sorted(table):
+        digest.update(f"{name}\x1f{fields[table[name]]}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def result_hash(result):
+    """Hash a parsed lookup result (a dict or any mapping); None (no results) hashes to None"""
+    if result is None:
+        return None
+    return hashlib.sha1(json_codec.dumps(dict(result)).encode('utf-8')).hexdigest()
+
+
+class FillIndex:
+    """SQLite-backed record of filled notes
+
+    Entries older than max_age_days are treated as unknown so that notes
+    are eventually checked against fresh dictionary data again.
+    """
+
+    def __init__(self, path, max_age_days=30):
+        self.path = path
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        """Open the database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS filled (
+                    note_id INTEGER PRIMARY KEY,
+                    keyword TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    result_hash TEXT,
+                    filled_at REAL NOT NULL
+                )"""
+            )
+            self._conn = conn
+        return self._conn
+
+    def load(self, note_ids):
+        """Return {note id: (keyword, fingerprint, result hash, fresh)} for known notes"""
+        cutoff = time.time() - self.max_age if self.max_age else 0
+        entries = {}
+        with self._lock:
+            conn = self._connect()
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (note_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM wanted")
+            conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((nid,) for nid in note_ids))
+            for nid, keyword, fingerprint, hashed, filled_at in conn.execute(
+                "SELECT f.note_id, f.keyword, f.fingerprint, f.result_hash, f.filled_at "
+                "FROM filled f JOIN wanted USING (note_id)"
+            ):
+                entries[nid] = (keyword, fingerprint, hashed, filled_at >= cutoff)
+            conn.execute("DELETE FROM wanted")
+            conn.commit()
+        return entries
+
+    def record(self, rows):
+        """Store (note id, keyword, fingerprint, result hash) rows"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO filled (note_id, keyword, fingerprint, result_hash, filled_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((nid, keyword, fingerprint, hashed, now) for nid, keyword, fingerprint, hashed in rows),
+            )
+            conn.commit()
+
+    def clear(self):
+        """Forget all filled notes"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM filled")
+            conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,177 @@
+"""
+Shared HTTP client for the Jisho.org API
+Keeps a pooled keep-alive session and adds retries with backoff,
+client-side rate limiting by priority and a circuit breaker
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from . import json_codec
+    from .scheduler import PriorityScheduler
+    from .stats import stats
+except ImportError:
+    import json_codec
+    from scheduler import PriorityScheduler
+    from stats import stats
+
+
+JISHO_API_URL = "https://jisho.org/api/v1/search/words"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when Jisho.org has failed too often and requests are short-circuited"""
+
+
+class CircuitBreaker:
+    """Fails fast after repeated errors until a cooldown has passed"""
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raise CircuitOpenError while the circuit is open"""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                # Half-open: let the next request through as a probe
+                self.opened_at = None
+                self.failures = self.threshold - 1
+                return
+        stats.count('circuit_open_rejections')
+        raise CircuitOpenError("Jisho.org is unavailable, try again later")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds, or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class JishoClient:
+    """Pooled, rate-limited client for the Jisho.org search API"""
+
+    def __init__(self, pool_size=4, timeout=10, max_retries=3, backoff_base=0.5,
+                 rate_limit_per_sec=5, rate_limit_burst=10,
+                 breaker_threshold=5, breaker_cooldown=30,
+                 interactive_reserve=2, fairness='round_robin'):
+        self.api_url = JISHO_API_URL
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limiter = PriorityScheduler(
+            rate_limit_per_sec, rate_limit_burst, interactive_reserve, fairness
+        )
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = "anki-jisho-import"
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a client from the "http" and "scheduler" sections of config.json"""
+        http = config.get("http", {})
+        scheduler = config.get("scheduler", {})
+        return cls(
+            pool_size=http.get("pool_size", 4),
+            timeout=http.get("timeout", 10),
+            max_retries=http.get("max_retries", 3),
+            backoff_base=http.get("backoff_base", 0.5),
+            rate_limit_per_sec=http.get("rate_limit_per_sec", 5),
+            rate_limit_burst=http.get("rate_limit_burst", 10),
+            breaker_threshold=http.get("breaker_threshold", 5),
+            breaker_cooldown=http.get("breaker_cooldown", 30),
+            interactive_reserve=scheduler.get("interactive_reserve", 2),
+            fairness=scheduler.get("fairness", "round_robin"),
+        )
+
+    def search(self, keyword, page=1):
+        """Search Jisho.org and return the decoded JSON response"""
+        params = {'keyword': keyword}
+        if page > 1:
+            params['page'] = page
+        return self.get_json(self.api_url, params)
+
+    def get_json(self, url, params=None):
+        """GET a JSON document with retries, backoff and rate limiting"""
+        attempt = 0
+        while True:
+            self.breaker.check()
+            self.rate_limiter.acquire()
+
+            retry_after = None
+            try:
+                started = time.perf_counter()
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                if stats.enabled:
+                    total = time.perf_counter() - started
+                    headers = response.elapsed.total_seconds()
+                    stats.record('http_request', total)
+                    stats.record('http_headers', headers)
+                    stats.record('http_transfer', max(total - headers, 0.0))
+                    stats.count('http_requests')
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    self.breaker.record_success()
+                    with stats.timer('json_decode'):
+                        return json_codec.loads(response.content)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    self.rate_limiter.block_for(retry_after)
+                error = requests.HTTPError(
+                    f"{response.status_code} Server Error for url: {response.url}", response=response
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            self.breaker.record_failure()
+            if attempt >= self.max_retries:
+                stats.count('http_failures')
+                raise error
+            stats.count('http_retries')
+
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, self.backoff_base * (2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
@@ -3,56 +3,115 @@ Jisho.org API parsing utilities
 Centralized parsing logic for both the main add-on and testing
 """
 
+from collections.abc import Mapping
+
+RESULT_KEYS = ('kanji', 'reading', 'meanings', 'pos', 'jlpt', 'common')
+
+
+def parse_senses(senses):
+    """Collect meanings and parts of speech from senses in a single pass"""
+    definitions = []
+    parts_of_speech = []
+    for sense in senses:
+        # Skip Wikipedia definitions
+        pos_list = sense.get('parts_of_speech', [])
+        if 'Wikipedia definition' in pos_list:
+            continue
+
+        definitions.extend(sense.get('english_definitions', []))
+        parts_of_speech.extend(pos_list)
+
+    meanings = '; '.join(definitions[:5])  # Limit to first 5 meanings
+
+    # Remove duplicates and limit
+    unique_pos = list(dict.fromkeys(parts_of_speech))  # Preserve order while removing dupes
+    pos = ', '.join(unique_pos[:3])  # Limit to first 3 unique POS
+    return meanings, pos
+
+
 def parse_jisho_result(result):
     """Parse Jisho.org API result into structured data"""
     parsed = {}
-    
+
     # Japanese text - use slug as primary, fallback to japanese[0].word
-    parsed['kanji'] = result.get('slug', '')
-    if not parsed['kanji']:
-        japanese = result.get('japanese', [{}])[0]
-        parsed['kanji'] = japanese.get('word', '')
-    
+    japanese = (result.get('japanese') or [{}])[0]
+    parsed['kanji'] = result.get('slug', '') or japanese.get('word', '')
+
     # Reading - from japanese[0].reading
-    japanese = result.get('japanese', [{}])[0]
     parsed['reading'] = japanese.get('reading', '')
-    
-    # English meanings
-    senses = result.get('senses', [])
-    if senses:
-        # Get all English definitions (exclude Wikipedia definitions)
-        definitions = []
-        for sense in senses:
-            # Skip Wikipedia definitions
-            parts_of_speech = sense.get('parts_of_speech', [])
-            if 'Wikipedia definition' in parts_of_speech:
-                continue
-            
-            english_definitions = sense.get('english_definitions', [])
-            if english_definitions:
-                definitions.extend(english_definitions)
-        
-        parsed['meanings'] = '; '.join(definitions[:5])  # Limit to first 5 meanings
-        
-        # Get parts of speech (exclude Wikipedia)
-        parts_of_speech = []
-        for sense in senses:
-            pos_list = sense.get('parts_of_speech', [])
-            if 'Wikipedia definition' not in pos_list:
-                parts_of_speech.extend(pos_list)
-        
-        # Remove duplicates and limit
-        unique_pos = list(dict.fromkeys(parts_of_speech))  # Preserve order while removing dupes
-        parsed['pos'] = ', '.join(unique_pos[:3])  # Limit to first 3 unique POS
-    else:
-        parsed['meanings'] = ''
-        parsed['pos'] = ''
-    
+
+    # English meanings and parts of speech (exclude Wikipedia)
+    parsed['meanings'], parsed['pos'] = parse_senses(result.get('senses', []))
+
     # JLPT level - it's a list, take the first one
     jlpt_list = result.get('jlpt', [])
     parsed['jlpt'] = jlpt_list[0] if jlpt_list else ''
-    
+
     # Common/frequency info
     parsed['common'] = 'Yes' if result.get('is_common', False) else 'No'
-    
-    return parsed
\ No newline at end of file
+
+    return parsed
+
+
+class JishoEntry(Mapping):
+    """Lazily parsed, read-only mapping view of one raw Jisho.org result
+
+    Cheap fields are read straight from the raw entry; senses are only
+    walked the first time meanings or parts of speech are requested.
+    """
+
+    __slots__ = ('raw', '_meanings', '_pos')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._meanings = None
+        self._pos = None
+
+    @property
+    def kanji(self):
+        japanese = (self.raw.get('japanese') or [{}])[0]
+        return self.raw.get('slug', '') or japanese.get('word', '')
+
+    @property
+    def reading(self):
+        return (self.raw.get('japanese') or [{}])[0].get('reading', '')
+
+    @property
+    def meanings(self):
+        if self._meanings is None:
+            self._meanings, self._pos = parse_senses(self.raw.get('senses', []))
+        return self._meanings
+
+    @property
+    def pos(self):
+        if self._pos is None:
+            self._meanings, self._pos = parse_senses(self.raw.get('senses', []))
+        return self._pos
+
+    @property
+    def jlpt(self):
+        jlpt_list = self.raw.get('jlpt', [])
+        return jlpt_list[0] if jlpt_list else ''
+
+    @property
+    def common(self):
+        return 'Yes' if self.raw.get('is_common', False) else 'No'
+
+    def __getitem__(self, key):
+        """Dict-style access so entries can stand in for parsed results"""
+        if key not in RESULT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(RESULT_KEYS)
+
+    def __len__(self):
+        return len(RESULT_KEYS)
+
+    def __contains__(self, key):
+        return key in RESULT_KEYS
+
+    def to_dict(self):
+        """Return the same dict parse_jisho_result would produce"""
+        return {key: getattr(self, key) for key in RESULT_KEYS}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Offline dictionary backend built from a JMdict / JMdict_e XML dump
+The dump is streamed once into an indexed SQLite file; lookups then
+need no network and return the same dict shape as parse_jisho_result
+
+Build the index with:
+    python jmdict.py JMdict_e.gz user_files/jmdict.sqlite3
+"""
+
+import gzip
+import os
+import sqlite3
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+try:
+    from .backends import LookupBackend
+except ImportError:
+    from backends import LookupBackend
+
+
+# Priority tags that Jisho.org treats as "common"
+COMMON_PRIORITIES = {'news1', 'ichi1', 'spec1', 'spec2', 'gai1'}
+
+# JMdict expands its POS entities to long descriptions; shorten the frequent ones
+POS_LABELS = {
+    'noun (common) (futsuumeishi)': 'Noun',
+    'adjective (keiyoushi)': 'I-adjective (keiyoushi)',
+    'adjectival nouns or quasi-adjectives (keiyodoshi)': 'Na-adjective (keiyodoshi)',
+    "nouns which may take the genitive case particle 'no'": "No-adjective",
+    'noun or participle which takes the aux. verb suru': 'Suru verb',
+    'adverb (fukushi)': 'Adverb (fukushi)',
+    'expressions (phrases, clauses, etc.)': 'Expressions (phrases, clauses, etc.)',
+}
+
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+BATCH_SIZE = 5000
+
+# Results per page, matching Jisho.org
+PAGE_SIZE = 20
+
+
+def pos_label(description):
+    """Map a JMdict POS description to a Jisho-style label"""
+    label = POS_LABELS.get(description)
+    if label:
+        return label
+    return description[:1].upper() + description[1:]
+
+
+def parse_entry(entry):
+    """Turn a JMdict <entry> element into (result, keys) for the index"""
+    kanji_forms = [k.findtext('keb') for k in entry.findall('k_ele')]
+    readings = [r.findtext('reb') for r in entry.findall('r_ele')]
+    priorities = {p.text for p in entry.iter() if p.tag in ('ke_pri', 're_pri')}
+
+    definitions = []
+    parts_of_speech = []
+    for sense in entry.findall('sense'):
+        sense_pos = [pos_label(p.text) for p in sense.findall('pos') if p.text]
+        parts_of_speech.extend(sense_pos)
+        for gloss in sense.findall('gloss'):
+            if gloss.get(XML_LANG, 'eng') == 'eng' and gloss.text:
+                definitions.append(gloss.text)
+
+    result = {
+        'kanji': kanji_forms[0] if kanji_forms else (readings[0] if readings else ''),
+        'reading': readings[0] if readings else '',
+        'meanings': '; '.join(definitions[:5]),
+        'pos': ', '.join(list(dict.fromkeys(parts_of_speech))[:3]),
+        'jlpt': '',
+        'common': 'Yes' if priorities & COMMON_PRIORITIES else 'No',
+    }
+    return result, kanji_forms + readings
+
+
+def open_dump(path):
+    """Open a JMdict dump, transparently handling .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def build_index(xml_path, db_path, progress=None):
+    """Stream a JMdict XML dump into an indexed SQLite database
+
+    The XML is read with iterparse and each <entry> is discarded once
+    stored, so memory use stays flat regardless of the dump size.
+    Returns the number of entries indexed.
+    """
+    tmp_path = db_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute(
+        """CREATE TABLE entries (
+            id INTEGER PRIMARY KEY,
+            kanji TEXT, reading TEXT, meanings TEXT, pos TEXT, jlpt TEXT,
+            common INTEGER
+        )"""
+    )
+    conn.execute("CREATE TABLE keys (key TEXT NOT NULL, entry_id INTEGER NOT NULL, rank INTEGER NOT NULL)")
+
+    entries = []
+    keys = []
+    count = 0
+    with open_dump(xml_path) as f:
+        context = ET.iterparse(f, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event != 'end' or elem.tag != 'entry':
+                continue
+            count += 1
+            result, forms = parse_entry(elem)
+            entries.append((
+                count, result['kanji'], result['reading'], result['meanings'],
+                result['pos'], result['jlpt'], result['common'] == 'Yes',
+            ))
+            keys.extend((form, count, rank) for rank, form in enumerate(dict.fromkeys(forms)))
+            root.clear()
+
+            if len(entries) >= BATCH_SIZE:
+                conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+                conn.executemany("INSERT INTO keys VALUES (?, ?, ?)", keys)
+                entries.clear()
+                keys.clear()
+                if progress:
+                    progress(count)
+
+    conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", entries)
+    conn.executemany("INSERT INTO keys VALUES (?, ?, ?)", keys)
+    conn.execute("CREATE INDEX keys_key ON keys(key)")
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return count
+
+
+class JMdictBackend(LookupBackend):
+    """Looks words up in a local index built by build_index"""
+
+    def __init__(self, db_path):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"JMdict index not found at {db_path}")
+        self.db_path = db_path
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def lookup(self, word):
+        results = self.search(word)
+        return (results[0] if results else None), None
+
+    def search(self, word, page=1):
+        # Prefer common entries, then entries where the word is the primary form
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT e.kanji, e.reading, e.meanings, e.pos, e.jlpt, e.common
+                   FROM keys k JOIN entries e ON e.id = k.entry_id
+                   WHERE k.key = ?
+                   ORDER BY e.common DESC, k.rank, e.id
+                   LIMIT ? OFFSET ?""",
+                (word.strip(), PAGE_SIZE, (page - 1) * PAGE_SIZE),
+            ).fetchall()
+        return [
+            {
+                'kanji': row[0],
+                'reading': row[1],
+                'meanings': row[2],
+                'pos': row[3],
+                'jlpt': row[4],
+                'common': 'Yes' if row[5] else 'No',
+            }
+            for row in rows
+        ]
+
+    def attributes(self, keys):
+        """Return {key: (jlpt, common)} for every key that has an entry"""
+        found = {}
+        with self._lock:
+            conn = self._conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (key TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM wanted")
+            conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((key,) for key in keys))
+            # Reverse of the search order, so the entry search() would rank first is seen last
+            for key, jlpt, common in conn.execute(
+                """SELECT w.key, e.jlpt, e.common
+                   FROM wanted w JOIN keys k ON k.key = w.key JOIN entries e ON e.id = k.entry_id
+                   ORDER BY e.common, k.rank DESC, e.id DESC"""
+            ):
+                found[key] = (jlpt or '', bool(common))
+            conn.execute("DELETE FROM wanted")
+            conn.commit()
+        return found
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python jmdict.py <JMdict_e[.gz]> <output.sqlite3>")
+        sys.exit(1)
+
+    started = time.time()
+    total = build_index(sys.argv[1], sys.argv[2], progress=lambda n: print(f"\r{n} entries", end=''))
+    print(f"\rIndexed {total} entries in {time.time() - started:.1f}s")
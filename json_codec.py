@@ -0,0 +1,25 @@
+"""
+JSON encoding and decoding for API responses and the lookup cache
+Uses orjson when it is installed (Anki bundles it) and falls back to
+the standard library json module otherwise
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def loads(data):
+    """Decode JSON from str or UTF-8 bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Encode obj as compact JSON text, keeping non-ASCII characters as they are"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
@@ -0,0 +1,97 @@
+"""
+Kana helpers for the local word index
+Folds katakana onto hiragana and spells kana in romaji the way
+learners type it (toukyou, konnichiha) so cached words can be found
+by reading or romaji prefix
+"""
+
+import re
+
+KATAKANA_START = 0x30A1
+KATAKANA_END = 0x30F6
+KANA_OFFSET = 0x60
+
+_MONOGRAPHS = {
+    'あ': 'a', 'い': 'i', 'う': 'u', 'え': 'e', 'お': 'o',
+    'か': 'ka', 'き': 'ki', 'く': 'ku', 'け': 'ke', 'こ': 'ko',
+    'が': 'ga', 'ぎ': 'gi', 'ぐ': 'gu', 'げ': 'ge', 'ご': 'go',
+    'さ': 'sa', 'し': 'shi', 'す': 'su', 'せ': 'se', 'そ': 'so',
+    'ざ': 'za', 'じ': 'ji', 'ず': 'zu', 'ぜ': 'ze', 'ぞ': 'zo',
+    'た': 'ta', 'ち': 'chi', 'つ': 'tsu', 'て': 'te', 'と': 'to',
+    'だ': 'da', 'ぢ': 'ji', 'づ': 'zu', 'で': 'de', 'ど': 'do',
+    'な': 'na', 'に': 'ni', 'ぬ': 'nu', 'ね': 'ne', 'の': 'no',
+    'は': 'ha', 'ひ': 'hi', 'ふ': 'fu', 'へ': 'he', 'ほ': 'ho',
+    'ば': 'ba', 'び': 'bi', 'ぶ': 'bu', 'べ': 'be', 'ぼ': 'bo',
+    'ぱ': 'pa', 'ぴ': 'pi', 'ぷ': 'pu', 'ぺ': 'pe', 'ぽ': 'po',
+    'ま': 'ma', 'み': 'mi', 'む': 'mu', 'め': 'me', 'も': 'mo',
+    'や': 'ya', 'ゆ': 'yu', 'よ': 'yo',
+    'ら': 'ra', 'り': 'ri', 'る': 'ru', 'れ': 're', 'ろ': 'ro',
+    'わ': 'wa', 'ゐ': 'i', 'ゑ': 'e', 'を': 'wo', 'ん': 'n', 'ゔ': 'vu',
+    'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o',
+    'ゃ': 'ya', 'ゅ': 'yu', 'ょ': 'yo', 'ゎ': 'wa', 'ゕ': 'ka', 'ゖ': 'ke',
+}
+
+# Kana followed by a small ya/yu/yo (or small vowel) read as one syllable
+_DIGRAPHS = {
+    'しゃ': 'sha', 'しゅ': 'shu', 'しょ': 'sho', 'しぇ': 'she',
+    'じゃ': 'ja', 'じゅ': 'ju', 'じょ': 'jo', 'じぇ': 'je',
+    'ちゃ': 'cha', 'ちゅ': 'chu', 'ちょ': 'cho', 'ちぇ': 'che',
+    'ぢゃ': 'ja', 'ぢゅ': 'ju', 'ぢょ': 'jo',
+    'ふぁ': 'fa', 'ふぃ': 'fi', 'ふぇ': 'fe', 'ふぉ': 'fo',
+    'てぃ': 'ti', 'でぃ': 'di', 'とぅ': 'tu', 'どぅ': 'du',
+    'うぃ': 'wi', 'うぇ': 'we', 'うぉ': 'wo',
+    'ゔぁ': 'va', 'ゔぃ': 'vi', 'ゔぇ': 've', 'ゔぉ': 'vo',
+}
+for _kana, _romaji in (('き', 'k'), ('ぎ', 'g'), ('に', 'n'), ('ひ', 'h'), ('び', 'b'),
+                       ('ぴ', 'p'), ('み', 'm'), ('り', 'r')):
+    for _small, _vowel in (('ゃ', 'ya'), ('ゅ', 'yu'), ('ょ', 'yo')):
+        _DIGRAPHS[_kana + _small] = _romaji + _vowel
+
+_KANA_RE = re.compile(r'[ぁ-ゖァ-ヺー]')
+
+
+def to_hiragana(text):
+    """Fold katakana onto hiragana, leaving everything else unchanged"""
+    return ''.join(
+        chr(ord(char) - KANA_OFFSET) if KATAKANA_START <= ord(char) <= KATAKANA_END else char
+        for char in text
+    )
+
+
+def is_kana(text):
+    """True if text is made up of kana only"""
+    return bool(text) and all(_KANA_RE.match(char) for char in text)
+
+
+def kana_to_romaji(text):
+    """Spell kana in romaji, doubling long vowels instead of using macrons
+
+    Characters that are not kana are passed through unchanged.
+    """
+    text = to_hiragana(text)
+    output = []
+    double_next = False
+    index = 0
+    while index < len(text):
+        char = text[index]
+        syllable = _DIGRAPHS.get(text[index:index + 2])
+        if syllable:
+            index += 2
+        else:
+            index += 1
+            if char == 'っ':
+                double_next = True
+                continue
+            if char == 'ー':
+                # Long vowel mark repeats the previous vowel
+                if output and output[-1][-1] in 'aeiou':
+                    output.append(output[-1][-1])
+                continue
+            syllable = _MONOGRAPHS.get(char, char)
+
+        if double_next:
+            double_next = False
+            if syllable[0] not in 'aeioun':
+                syllable = ('t' if syllable.startswith('ch') else syllable[0]) + syllable
+        output.append(syllable)
+    return ''.join(output)
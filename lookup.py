@@ -0,0 +1,219 @@
+"""
+Cache-aware word lookups independent of Anki
+Shared by the add-on, the batch fill and the test suite
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from .jisho_parser import JishoEntry
+    from .lookup_cache import normalize_keyword
+    from .stats import stats
+except ImportError:
+    from jisho_parser import JishoEntry
+    from lookup_cache import normalize_keyword
+    from stats import stats
+
+
+class SingleFlight:
+    """Lets concurrent callers for the same key share one in-flight call"""
+
+    class _Call:
+        __slots__ = ('done', 'result', 'error')
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for and share the result of a call already running"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Number of keys currently being fetched"""
+        return len(self._calls)
+
+
+class WordLookup:
+    """Looks words up through a backend, serving repeats from the cache"""
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if backend.uses_cache else None
+        self.flights = SingleFlight()
+
+    def lookup(self, word):
+        """Return the best parsed result for a word; errors are raised to the caller"""
+        # Near-duplicate keywords collapse onto one normalized key
+        key = normalize_keyword(word)
+        if not key:
+            return None
+
+        with stats.timer('lookup'):
+            # Serve repeat lookups from the local cache
+            if self.cache:
+                with stats.timer('cache_check'):
+                    found, cached = self.cache.get(key)
+                if found:
+                    stats.count('cache_hits')
+                    return cached
+                stats.count('cache_misses')
+
+            return self.flights.do(key, lambda: self._fetch(key))
+
+    def _fetch(self, key):
+        """Query the backend and remember the result"""
+        try:
+            result, entries = self.backend.lookup(key)
+        except Exception:
+            stats.count('lookup_failures')
+            raise
+
+        if self.cache:
+            self.cache.put(key, result, entries)
+        return result
+
+    def suggest(self, word, limit=10):
+        """Return cached words starting with word, without any network access"""
+        if not self.cache:
+            return []
+        with stats.timer('suggest'):
+            return self.cache.suggest(word, limit)
+
+    def search_results(self, word, page=1):
+        """Return one page of lazily parsed candidates for a word; errors are raised"""
+        word = word.strip()
+        if not word:
+            return []
+
+        # The first page of Jisho.org results is kept in the cache with each lookup
+        if self.cache and page == 1:
+            entries = self.cache.get_entries(word)
+            if entries is not None:
+                return [JishoEntry(entry) for entry in entries]
+
+        results = self.backend.search(word, page)
+
+        if self.cache and page == 1:
+            self.cache.put(
+                word, results[0].to_dict() if results else None, [entry.raw for entry in results]
+            )
+        return results
+
+
+class Prefetcher:
+    """Speculatively looks up the latest requested word in the background
+
+    Requests are debounced: a word is only fetched once no newer word has
+    been requested for delay seconds, and superseded words are dropped.
+    """
+
+    def __init__(self, lookup, delay=0.3):
+        self.lookup = lookup
+        self.delay = delay
+        self.prefetched = 0
+        self._pending = None
+        self._due = 0.0
+        self._closed = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def request(self, word):
+        """Schedule a prefetch, replacing any that has not started yet"""
+        with self._condition:
+            if self._closed:
+                return
+            self._pending = word
+            self._due = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jisho-prefetch", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def cancel(self):
+        """Drop the pending prefetch, if any"""
+        with self._condition:
+            self._pending = None
+            self._condition.notify()
+
+    def close(self):
+        """Drop the pending prefetch and stop the background thread"""
+        with self._condition:
+            self._pending = None
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    self._thread = None
+                    return
+                wait = self._due - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                word, self._pending = self._pending, None
+
+            try:
+                self.lookup(word)
+                self.prefetched += 1
+            except Exception as e:
+                print(f"Prefetch of {word} failed: {e}")
+
+
+def lookup_many(lookup, words, max_workers=4, progress=None):
+    """Resolve {key: word} through a bounded thread pool
+
+    progress(done, total, rate) is called after every finished lookup.
+    Returns ({key: result}, number of failed lookups).
+    """
+    results = {}
+    failures = 0
+    total = len(words)
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(lookup, word): key for key, word in words.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                print(f"Error looking up {words[key]}: {e}")
+                failures += 1
+
+            if progress:
+                progress(done, total, done / max(time.time() - started, 1e-6))
+
+    return results, failures
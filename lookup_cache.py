@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Persistent lookup cache for Jisho.org results
+Stores parsed results in a local SQLite database so repeat lookups
+are served without touching the network, and indexes every cached
+word by kanji, reading and romaji for instant prefix suggestions
+
+Caches can be shared as compressed snapshots:
+    python lookup_cache.py export team_cache.jsonl.gz
+    python lookup_cache.py import team_cache.jsonl.gz
+"""
+
+import gzip
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+
+try:
+    from . import json_codec
+    from .jisho_parser import parse_jisho_result
+    from .kana import is_kana, kana_to_romaji, to_hiragana
+except ImportError:
+    import json_codec
+    from jisho_parser import parse_jisho_result
+    from kana import is_kana, kana_to_romaji, to_hiragana
+
+# Upper bound for prefix range scans: every string starting with a prefix sorts below prefix + this
+PREFIX_END = '\U0010ffff'
+
+# Snapshot files are gzipped JSON lines: a header, then one array per lookup ("L") or indexed word ("W")
+SNAPSHOT_FORMAT = "anki-jisho-import/lookup-cache"
+SNAPSHOT_VERSION = 1
+
+# Rows per executemany() call when importing a snapshot
+IMPORT_BATCH_SIZE = 5000
+
+# PRAGMA user_version once the words table covers every cached lookup
+WORD_INDEX_VERSION = 1
+
+# Lookups indexed per lock hold while upgrading an older cache
+INDEX_BATCH_SIZE = 200
+
+# Longest time suggest() waits for the cache before giving up, in seconds;
+# it is called on Anki's main thread while typing
+SUGGEST_LOCK_TIMEOUT = 0.05
+
+
+# Romaji long vowels written with macrons (Tōkyō) are looked up as doubled vowels (toukyou)
+MACRON_FOLDS = str.maketrans({
+    'ā': 'aa', 'ī': 'ii', 'ū': 'uu', 'ē': 'ee', 'ō': 'ou',
+    'â': 'aa', 'î': 'ii', 'û': 'uu', 'ê': 'ee', 'ô': 'ou',
+})
+
+
+def normalize_keyword(word):
+    """Normalize a search keyword into a cache key
+
+    Folds full-width/half-width forms (ＡＢＣ, ﾈｺ), whitespace, letter case
+    and romaji macrons so near-duplicate keywords share one lookup.
+    Hiragana and katakana are kept apart because Jisho.org ranks them differently.
+    """
+    word = unicodedata.normalize('NFKC', word)
+    return ' '.join(word.split()).lower().translate(MACRON_FOLDS)
+
+
+class LookupCache:
+    """SQLite-backed keyword cache with TTL expiry and LRU eviction"""
+
+    def __init__(self, path, ttl_days=30, max_entries=50000):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._words_ready = threading.Event()
+        self._index_lock = threading.Lock()
+        self._index_thread = None
+
+    def _connect(self):
+        """Open the database on first use"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS lookups (
+                    keyword TEXT PRIMARY KEY,
+                    result TEXT,
+                    raw TEXT,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS lookups_last_access ON lookups(last_access)")
+            has_words = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'words'"
+            ).fetchone()
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS words (
+                    kanji TEXT NOT NULL,
+                    reading TEXT NOT NULL,
+                    reading_key TEXT NOT NULL,
+                    romaji TEXT NOT NULL,
+                    common INTEGER NOT NULL,
+                    keyword TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (kanji, reading)
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS words_reading_key ON words(reading_key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS words_romaji ON words(romaji)")
+            conn.execute("CREATE INDEX IF NOT EXISTS words_keyword ON words(keyword)")
+            version = conn.execute("PRAGMA user_version").fetchone()[0] if has_words else 0
+            if version < WORD_INDEX_VERSION and conn.execute("SELECT 1 FROM lookups LIMIT 1").fetchone() is None:
+                # Nothing to index in a new or empty cache
+                conn.execute(f"PRAGMA user_version = {WORD_INDEX_VERSION}")
+                version = WORD_INDEX_VERSION
+            conn.commit()
+            if version >= WORD_INDEX_VERSION:
+                self._words_ready.set()
+            else:
+                # Caches from older versions are indexed by build_word_index()
+                self._words_ready.clear()
+            self._size = conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, word):
+        """Return (found, result) for a keyword; result is None for cached misses"""
+        key = normalize_keyword(word)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT result, fetched_at FROM lookups WHERE keyword = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return False, None
+            conn.execute("UPDATE lookups SET last_access = ? WHERE keyword = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return True, json_codec.loads(row[0]) if row[0] else None
+
+    def get_entries(self, word):
+        """Return the cached raw result entries for a keyword, or None"""
+        key = normalize_keyword(word)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT raw, fetched_at FROM lookups WHERE keyword = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] is None or (self.ttl and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            conn.execute("UPDATE lookups SET last_access = ? WHERE keyword = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json_codec.loads(row[0])
+
+    def put(self, word, result, raw=None):
+        """Store a parsed result (or None for "no results") for a keyword"""
+        key = normalize_keyword(word)
+        now = time.time()
+        result_json = json_codec.dumps(result) if result is not None else None
+        raw_json = json_codec.dumps(raw) if raw is not None else None
+        with self._lock:
+            conn = self._connect()
+            exists = conn.execute("SELECT 1 FROM lookups WHERE keyword = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO lookups (keyword, result, raw, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, result_json, raw_json, now, now),
+            )
+            if not exists:
+                self._size += 1
+            else:
+                conn.execute("DELETE FROM words WHERE keyword = ?", (key,))
+            self._index_words(conn, key, result, raw)
+            self._evict(conn)
+            conn.commit()
+
+    def _index_words(self, conn, key, result, raw):
+        """Add every word of a cached response to the kanji/reading/romaji index"""
+        words = [parse_jisho_result(entry) for entry in raw] if raw else [result] if result else []
+        rows = []
+        for word in words:
+            kanji = word.get('kanji', '')
+            reading = word.get('reading', '')
+            if not kanji and not reading:
+                continue
+            reading_key = to_hiragana(reading)
+            rows.append((
+                kanji, reading, reading_key, kana_to_romaji(reading_key),
+                1 if word.get('common') == 'Yes' else 0,
+                key, json_codec.dumps(word),
+            ))
+        conn.executemany(
+            "INSERT OR REPLACE INTO words (kanji, reading, reading_key, romaji, common, keyword, result) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _evict(self, conn):
+        """Drop least recently used entries beyond the size cap"""
+        if not self.max_entries:
+            return
+        excess = self._size - self.max_entries
+        if excess > 0:
+            keys = conn.execute(
+                "SELECT keyword FROM lookups ORDER BY last_access LIMIT ?", (excess,)
+            ).fetchall()
+            conn.executemany("DELETE FROM lookups WHERE keyword = ?", keys)
+            conn.executemany("DELETE FROM words WHERE keyword = ?", keys)
+            self._size -= len(keys)
+
+    def build_word_index(self):
+        """Index the words of lookups cached before the word index existed
+
+        Works in small batches so lookups are only held up briefly, and
+        returns once the index is complete; safe to call from several
+        threads. suggest() returns nothing until it has finished.
+        """
+        with self._index_lock:
+            with self._lock:
+                self._connect()
+                if self._words_ready.is_set():
+                    return
+                keys = [row[0] for row in self._conn.execute("SELECT keyword FROM lookups")]
+            for start in range(0, len(keys), INDEX_BATCH_SIZE):
+                batch = keys[start:start + INDEX_BATCH_SIZE]
+                with self._lock:
+                    if self._conn is None:
+                        # Closed in the meantime; the next open resumes the upgrade
+                        return
+                    conn = self._conn
+                    rows = conn.execute(
+                        f"SELECT keyword, result, raw FROM lookups "
+                        f"WHERE keyword IN ({', '.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    for key, result_json, raw_json in rows:
+                        conn.execute("DELETE FROM words WHERE keyword = ?", (key,))
+                        self._index_words(
+                            conn, key,
+                            json_codec.loads(result_json) if result_json else None,
+                            json_codec.loads(raw_json) if raw_json else None,
+                        )
+                    conn.commit()
+            with self._lock:
+                if self._conn is None:
+                    return
+                self._conn.execute(f"PRAGMA user_version = {WORD_INDEX_VERSION}")
+                self._conn.commit()
+                self._words_ready.set()
+
+    def _start_word_index(self):
+        """Build the word index on a background thread, once"""
+        if self._index_thread is None or not self._index_thread.is_alive():
+            self._index_thread = threading.Thread(
+                target=self.build_word_index, name="jisho-word-index", daemon=True
+            )
+            self._index_thread.start()
+
+    def suggest(self, prefix, limit=10):
+        """Return cached words whose kanji, reading or romaji starts with prefix
+
+        Exact matches come first, then common words, then shorter words.
+        Suggestions are served from local data only and ignore the TTL.
+        Never blocks for long: while the cache is busy or an older cache
+        is still being indexed in the background, nothing is suggested.
+        """
+        key = normalize_keyword(prefix)
+        if not key:
+            return []
+        if is_kana(key):
+            searches = [('reading_key', to_hiragana(key)), ('kanji', key)]
+        elif key.isascii():
+            searches = [('romaji', key.replace(' ', '').replace('-', ''))]
+        else:
+            searches = [('kanji', key)]
+
+        found = {}
+        if not self._lock.acquire(timeout=SUGGEST_LOCK_TIMEOUT):
+            return []
+        try:
+            conn = self._connect()
+            if not self._words_ready.is_set():
+                self._start_word_index()
+                return []
+            for column, value in searches:
+                # Range scans walk the column's index in order; rank a few more than needed
+                for row in conn.execute(
+                    f"SELECT kanji, reading, {column}, common, result FROM words "
+                    f"WHERE {column} >= ? AND {column} < ? ORDER BY {column} LIMIT ?",
+                    (value, value + PREFIX_END, limit * 4),
+                ):
+                    rank = (row[2] != value, not row[3], len(row[2]), row[2])
+                    if (row[0], row[1]) not in found or rank < found[row[0], row[1]][0]:
+                        found[row[0], row[1]] = (rank, row[4])
+        finally:
+            self._lock.release()
+        ranked = sorted(found.values(), key=lambda item: item[0])[:limit]
+        return [json_codec.loads(result) for _, result in ranked]
+
+    def attributes(self, keys):
+        """Return {key: (jlpt, common)} for normalized keywords known to the cache
+
+        A cached lookup of the keyword itself wins over words indexed from
+        other responses, which match on kanji first, then on reading.
+        Like suggest(), this reads local data only and ignores the TTL.
+        """
+        self.build_word_index()
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (key TEXT PRIMARY KEY, kana_key TEXT)")
+            conn.execute("DELETE FROM wanted")
+            conn.executemany(
+                "INSERT OR IGNORE INTO wanted VALUES (?, ?)", ((key, to_hiragana(key)) for key in keys)
+            )
+            # Weakest matches come first so that stronger ones overwrite them
+            queries = (
+                "SELECT wanted.key, w.result FROM wanted JOIN words w ON w.reading_key = wanted.kana_key "
+                "ORDER BY w.common",
+                "SELECT wanted.key, w.result FROM wanted JOIN words w ON w.kanji = wanted.key "
+                "ORDER BY w.common",
+                "SELECT wanted.key, l.result FROM wanted JOIN lookups l ON l.keyword = wanted.key "
+                "WHERE l.result IS NOT NULL",
+            )
+            for query in queries:
+                for key, result_json in conn.execute(query):
+                    result = json_codec.loads(result_json)
+                    found[key] = (result.get('jlpt', ''), result.get('common') == 'Yes')
+            conn.execute("DELETE FROM wanted")
+            conn.commit()
+        return found
+
+    def clear(self):
+        """Remove all cached entries"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM lookups")
+            conn.execute("DELETE FROM words")
+            conn.commit()
+            self._size = 0
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            self._connect()
+            return {'hits': self.hits, 'misses': self.misses, 'entries': self._size}
+
+    def export_snapshot(self, path):
+        """Write all cached lookups and their indexed words to a gzipped snapshot
+
+        Reads through a separate connection inside one read transaction, so
+        lookups keep working and the snapshot is consistent.
+        Returns the number of lookups written.
+        """
+        # Snapshots carry the word index, so an older cache is indexed first
+        self.build_word_index()
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            conn.execute("BEGIN")
+            count = conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                header = {
+                    'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION,
+                    'created': time.time(), 'lookups': count,
+                }
+                f.write(json_codec.dumps(header) + '\n')
+                # result and raw stay JSON text so importing never re-encodes them
+                for row in conn.execute("SELECT keyword, result, raw, fetched_at FROM lookups"):
+                    f.write(json_codec.dumps(['L', *row]) + '\n')
+                for row in conn.execute(
+                    "SELECT kanji, reading, reading_key, romaji, common, keyword, result FROM words"
+                ):
+                    f.write(json_codec.dumps(['W', *row]) + '\n')
+            conn.rollback()
+        finally:
+            conn.close()
+        return count
+
+    def import_snapshot(self, path, progress=None):
+        """Merge a snapshot into the cache, keeping whichever copy of a lookup is newer
+
+        Rows are first decoded into a staging database without holding the
+        cache lock, so lookups keep working; the lock is only taken for the
+        few set-based statements that merge the newer lookups. Entries
+        already past the TTL are skipped. progress(rows) is called after
+        every staged batch.
+        Returns (lookups imported, lookups skipped).
+        """
+        cutoff = time.time() - self.ttl if self.ttl else 0
+        fd, staging_path = tempfile.mkstemp(prefix='jisho-snapshot-', suffix='.sqlite3')
+        os.close(fd)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                header = json_codec.loads(f.readline() or 'null')
+                if not isinstance(header, dict) or header.get('format') != SNAPSHOT_FORMAT:
+                    raise ValueError(f"{path} is not a lookup cache snapshot")
+                if header.get('version', 0) > SNAPSHOT_VERSION:
+                    raise ValueError(f"Snapshot version {header['version']} is newer than this add-on supports")
+                self._stage_snapshot(staging_path, f, progress)
+
+            with self._lock:
+                conn = self._connect()
+                conn.execute("ATTACH DATABASE ? AS snapshot", (staging_path,))
+                try:
+                    imported, total = self._merge_snapshot(conn, cutoff)
+                except BaseException:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.execute("DETACH DATABASE snapshot")
+        finally:
+            os.remove(staging_path)
+        return imported, total - imported
+
+    @staticmethod
+    def _stage_snapshot(staging_path, f, progress):
+        """Stream snapshot rows into the tables of a separate staging database"""
+        staging = sqlite3.connect(staging_path)
+        try:
+            # Throwaway file: no journal and no syncing
+            staging.execute("PRAGMA journal_mode=OFF")
+            staging.execute("PRAGMA synchronous=OFF")
+            staging.execute(
+                "CREATE TABLE snapshot_lookups "
+                "(keyword TEXT PRIMARY KEY, result TEXT, raw TEXT, fetched_at REAL NOT NULL)"
+            )
+            staging.execute(
+                "CREATE TABLE snapshot_words "
+                "(kanji TEXT, reading TEXT, reading_key TEXT, romaji TEXT, common INTEGER, keyword TEXT, result TEXT)"
+            )
+
+            lookups, words = [], []
+            rows = 0
+
+            def flush():
+                staging.executemany("INSERT OR REPLACE INTO snapshot_lookups VALUES (?, ?, ?, ?)", lookups)
+                staging.executemany("INSERT INTO snapshot_words VALUES (?, ?, ?, ?, ?, ?, ?)", words)
+                lookups.clear()
+                words.clear()
+                if progress:
+                    progress(rows)
+
+            for line in f:
+                row = json_codec.loads(line)
+                if row[0] == 'L':
+                    lookups.append(row[1:])
+                elif row[0] == 'W':
+                    words.append(row[1:])
+                rows += 1
+                if len(lookups) + len(words) >= IMPORT_BATCH_SIZE:
+                    flush()
+            flush()
+            staging.execute("CREATE INDEX snapshot_words_keyword ON snapshot_words(keyword)")
+            staging.commit()
+        finally:
+            staging.close()
+
+    def _merge_snapshot(self, conn, cutoff):
+        """Merge the newer lookups of the attached staging database into the cache"""
+        conn.execute("DROP TABLE IF EXISTS temp.snapshot_newer")
+        conn.execute(
+            "CREATE TEMP TABLE snapshot_newer AS SELECT s.keyword FROM snapshot.snapshot_lookups s "
+            "LEFT JOIN lookups l ON l.keyword = s.keyword "
+            "WHERE (l.keyword IS NULL OR s.fetched_at > l.fetched_at) AND s.fetched_at >= ?",
+            (cutoff,),
+        )
+        imported = conn.execute("SELECT COUNT(*) FROM snapshot_newer").fetchone()[0]
+        total = conn.execute("SELECT COUNT(*) FROM snapshot.snapshot_lookups").fetchone()[0]
+        conn.execute("DELETE FROM words WHERE keyword IN (SELECT keyword FROM snapshot_newer)")
+        # Imported entries count as used at fetch time, behind anything used on this machine
+        conn.execute(
+            "INSERT OR REPLACE INTO lookups (keyword, result, raw, fetched_at, last_access) "
+            "SELECT s.keyword, s.result, s.raw, s.fetched_at, s.fetched_at "
+            "FROM snapshot.snapshot_lookups s JOIN snapshot_newer USING (keyword)"
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO words (kanji, reading, reading_key, romaji, common, keyword, result) "
+            "SELECT w.kanji, w.reading, w.reading_key, w.romaji, w.common, w.keyword, w.result "
+            "FROM snapshot.snapshot_words w JOIN snapshot_newer USING (keyword)"
+        )
+        conn.execute("DROP TABLE snapshot_newer")
+
+        self._size = conn.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+        self._evict(conn)
+        conn.commit()
+        return imported, total
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or sys.argv[1] not in ('export', 'import'):
+        print("Usage: python lookup_cache.py export|import <snapshot.jsonl.gz> [lookup_cache.sqlite3]")
+        sys.exit(1)
+
+    from config_store import ConfigStore
+
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_config = ConfigStore(os.path.join(addon_dir, 'config.json')).get()['cache']
+    cache = LookupCache(
+        sys.argv[3] if len(sys.argv) == 4 else os.path.join(addon_dir, 'user_files', 'lookup_cache.sqlite3'),
+        ttl_days=cache_config.get('ttl_days', 30),
+        max_entries=cache_config.get('max_entries', 50000),
+    )
+    started = time.time()
+    if sys.argv[1] == 'export':
+        count = cache.export_snapshot(sys.argv[2])
+        print(f"Exported {count} lookups in {time.time() - started:.1f}s")
+    else:
+        imported, skipped = cache.import_snapshot(
+            sys.argv[2], progress=lambda rows: print(f"\r{rows} rows", end='')
+        )
+        print(f"\rImported {imported} lookups ({skipped} older or expired skipped) in {time.time() - started:.1f}s")
+    cache.close()
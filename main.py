@@ -1,79 +1,262 @@
-import json
-import requests
-from urllib.parse import quote
 from aqt import mw, gui_hooks
+from aqt.operations import QueryOp
 from aqt.qt import *
 from aqt.utils import showInfo, showCritical, tooltip
 from anki.hooks import addHook
-import re
 import os
-from .jisho_parser import parse_jisho_result
+import time
+# Only lightweight modules are imported at startup; the HTTP stack, parser,
+# cache and backends are imported when the first lookup needs them
+from .config_store import ConfigStore
+from .field_resolver import find_matching_field, resolver
+from .stats import stats
+
+
+ADDON_DIR = os.path.dirname(__file__)
+
+config_store = ConfigStore(
+    os.path.join(ADDON_DIR, 'config.json'), os.path.join(ADDON_DIR, 'meta.json')
+)
+
+_lookup_cache = None
+_jisho_client = None
+_backend = None
+_importer = None
+_prefetcher = None
+_audio_pipeline = None
+_tokenizer = None
+# Config sections the shared client, cache, backend, importer and prefetcher were built from
+_service_settings = None
+
+SERVICE_SETTINGS = ("backend", "jmdict_db", "http", "scheduler", "cache", "prefetch")
+
+
+def get_lookup_cache(config):
+    """Return the shared lookup cache, or None if caching is disabled"""
+    global _lookup_cache
+    cache_config = config.get("cache", {})
+    if not cache_config.get("enabled", True):
+        return None
+    if _lookup_cache is None:
+        from .lookup_cache import LookupCache
+        remember_service_settings(config)
+        _lookup_cache = LookupCache(
+            os.path.join(ADDON_DIR, 'user_files', 'lookup_cache.sqlite3'),
+            ttl_days=cache_config.get("ttl_days", 30),
+            max_entries=cache_config.get("max_entries", 50000),
+        )
+    return _lookup_cache
+
+
+def get_jisho_client(config):
+    """Return the shared HTTP client so all lookups reuse pooled connections"""
+    global _jisho_client
+    if _jisho_client is None:
+        from .jisho_client import JishoClient
+        remember_service_settings(config)
+        _jisho_client = JishoClient.from_config(config)
+    return _jisho_client
+
+
+def get_backend(config):
+    """Return the shared dictionary backend selected in config.json"""
+    global _backend
+    if _backend is None:
+        from .backends import create_backend
+        remember_service_settings(config)
+        _backend = create_backend(config, lambda: get_jisho_client(config), ADDON_DIR)
+    return _backend
+
+
+def service_settings(config):
+    """The config sections the shared lookup services depend on"""
+    return tuple(config.get(key) for key in SERVICE_SETTINGS)
+
+
+def remember_service_settings(config):
+    """Record the settings the first of the shared lookup services is built from"""
+    global _service_settings
+    if _service_settings is None:
+        _service_settings = service_settings(config)
+
+
+def reset_lookup_services():
+    """Close the shared client, cache, backend and prefetcher so they are rebuilt on next use"""
+    global _lookup_cache, _jisho_client, _backend, _importer, _prefetcher, _service_settings
+    if _prefetcher is not None:
+        _prefetcher.close()
+    if _backend is not None:
+        _backend.close()
+    if _jisho_client is not None:
+        _jisho_client.close()
+    if _lookup_cache is not None:
+        _lookup_cache.close()
+    _lookup_cache = _jisho_client = _backend = _importer = _prefetcher = _service_settings = None
+    from .batch import reset_fill_index
+    reset_fill_index()
+
+
+def get_audio_pipeline(config):
+    """Return the shared audio pipeline for the open profile, or None if audio is disabled"""
+    global _audio_pipeline
+    audio_config = config.get("audio", {})
+    if not audio_config.get("enabled", False) or mw.col is None:
+        return None
+    media_dir = mw.col.media.dir()
+    if _audio_pipeline is not None and _audio_pipeline.media_dir != media_dir:
+        # Another profile was opened since the pipeline was built
+        reset_audio_pipeline()
+    if _audio_pipeline is None:
+        from .audio import AudioPipeline, create_audio_source
+        _audio_pipeline = AudioPipeline(
+            create_audio_source(config), media_dir, max_workers=audio_config.get("max_workers", 2),
+            write=mw.col.media.write_data,
+        )
+    return _audio_pipeline
+
+
+def get_tokenizer(config):
+    """Return the shared analyzer for multi-word fields, or None if tokenizing is disabled"""
+    global _tokenizer
+    settings = config.get("tokenizer", {})
+    if not settings.get("enabled", False):
+        return None
+    if _tokenizer is None:
+        from .tokenizer import create_tokenizer
+        # Falls back to simple splitting if the analyzer cannot be loaded
+        _tokenizer = create_tokenizer(settings.get("analyzer", "auto"))
+    return _tokenizer
+
+
+def reset_tokenizer():
+    """Drop the analyzer so the next use picks up new settings"""
+    global _tokenizer
+    _tokenizer = None
+
+
+def reset_audio_pipeline():
+    """Drop the audio pipeline so the next use picks up new settings"""
+    global _audio_pipeline
+    if _audio_pipeline is not None:
+        _audio_pipeline.close()
+        _audio_pipeline = None
 
 
 class JishoImporter:
     """Main class for Jisho.org API integration"""
     
     def __init__(self):
-        self.jisho_api_url = "https://jisho.org/api/v1/search/words"
-        self.config = self.load_config()
+        from .lookup import WordLookup
+        self.backend = get_backend(self.config)
+        self.cache = get_lookup_cache(self.config) if self.backend.uses_cache else None
+        self.lookups = WordLookup(self.backend, self.cache)
+    
+    @property
+    def config(self):
+        """Current read-only config snapshot"""
+        return config_store.get()
         
     def load_config(self):
         """Load configuration from config.json"""
-        try:
-            config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Could not load config: {e}")
-        
-        # Default configuration
-        return {
-            "field_mappings": {
-                "Japanese": "kanji",
-                "Reading": "reading",
-                "Meaning": "meanings", 
-                "JLPT": "jlpt",
-                "PartOfSpeech": "pos",
-                "Common": "common"
-            },
-            "keyboard_shortcut": "Ctrl+J"
-        }
+        return load_config()
         
     def search_word(self, word):
         """Search for a Japanese word using Jisho.org API"""
         try:
-            # Clean the word input
-            word = word.strip()
-            if not word:
-                return None
-                
-            # Make API request
-            url = f"{self.jisho_api_url}?keyword={quote(word)}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            if not data.get('data'):
-                return None
-                
-            # Get the first result (most relevant)
-            result = data['data'][0]
-            return parse_jisho_result(result)
-            
-        except requests.RequestException as e:
-            showCritical(f"Network error: {str(e)}")
-            return None
+            return self.lookup(word)
         except Exception as e:
-            showCritical(f"Error searching word: {str(e)}")
+            showCritical(describe_lookup_error(e))
             return None
     
-    def get_audio_url(self, word):
-        """Generate audio URL for Japanese word"""
-        # Using Forvo or similar service would be ideal, but for now we'll use a simple approach
-        # You might want to integrate with a TTS service or Forvo API
-        return f"https://www.gstatic.com/hostedimg/382a91be5ab2a4e8_large"  # Placeholder
+    def lookup(self, word):
+        """Look up a word without any UI; errors are raised to the caller"""
+        return self.lookups.lookup(word)
+    
+    def lookup_field(self, text):
+        """Look up a field's content, word by word if it holds several; errors are raised
+        
+        With the tokenizer enabled, content that splits into more than one
+        lemma is looked up concurrently and merged into the token fields.
+        """
+        tokenizer = get_tokenizer(self.config)
+        if tokenizer is not None:
+            tokens = tokenizer.lemmas(text)
+            if len(tokens) > 1:
+                from .tokenizer import lookup_tokens, merge_token_results
+                settings = self.config.get("tokenizer", {})
+                results = lookup_tokens(self.lookup, tokens, settings.get("max_workers", 8))
+                return merge_token_results(tokens, results, settings.get("separator", "<br>"))
+        return self.lookup(text)
+    
+    def search_results(self, word, page=1):
+        """Return one page of lazily parsed candidates for a word; errors are raised"""
+        return self.lookups.search_results(word, page)
+    
+    def suggest(self, word, limit=10):
+        """Return previously fetched words starting with word from the local cache"""
+        try:
+            return self.lookups.suggest(word, limit)
+        except Exception as e:
+            print(f"Error reading suggestions for {word}: {e}")
+            return []
+    
+    @property
+    def audio_enabled(self):
+        return self.config.get("audio", {}).get("enabled", False)
+    
+    def add_audio(self, data, best_effort=True):
+        """Return a copy of data with an "audio" sound tag when audio is enabled
+        
+        Runs the audio source, so call it off the main thread. By default
+        audio is best effort and on errors the data is returned without
+        audio; with best_effort=False errors are raised.
+        """
+        if not data:
+            return data
+        try:
+            pipeline = get_audio_pipeline(self.config)
+            if pipeline is None:
+                return data
+            from .audio import with_audio
+            return with_audio(pipeline, data)
+        except Exception as e:
+            if not best_effort:
+                raise
+            print(f"Error generating audio for {data.get('kanji', '')}: {e}")
+            return data
+    
+    def lookup_in_background(self, text, on_done):
+        """Look up field content (and its audio, if enabled) on a background thread and return its Future
+        
+        on_done(result, error) is called on the main thread when the lookup finishes.
+        """
+        return self.run_in_background(lambda: self.add_audio(self.lookup_field(text)), on_done)
+    
+    def run_in_background(self, task, on_done):
+        """Run task on a background thread and return its Future
+        
+        on_done(result, error) is called on the main thread when the task finishes.
+        """
+        def finished(future):
+            if future.cancelled():
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                on_done(None, e)
+            else:
+                on_done(result, None)
+        
+        return mw.taskman.run_in_background(task, finished)
+    
+
+
+def get_importer():
+    """Return the shared importer, building the lookup services on first use"""
+    global _importer
+    if _importer is None:
+        _importer = JishoImporter()
+    return _importer
 
 
 class JishoDialog(QDialog):
@@ -82,12 +265,17 @@ class JishoDialog(QDialog):
     def __init__(self, parent, editor):
         super().__init__(parent)
         self.editor = editor
-        self.importer = JishoImporter()
+        self.importer = get_importer()
+        self.pending_search = None
+        self.search_generation = 0
+        self.search_word = ''
+        self.search_page = 1
+        self.results = []
         self.setupUI()
         
     def setupUI(self):
         self.setWindowTitle("Jisho Import")
-        self.setFixedSize(400, 300)
+        self.setFixedSize(450, 420)
         
         layout = QVBoxLayout()
         
@@ -96,6 +284,8 @@ class JishoDialog(QDialog):
         search_layout.addWidget(QLabel("Japanese Word:"))
         self.search_input = QLineEdit()
         self.search_input.returnPressed.connect(self.search_and_fill)
+        self.search_input.textChanged.connect(self.show_suggestions)
+        self.search_input.textChanged.connect(self.schedule_search)
         search_layout.addWidget(self.search_input)
         
         self.search_btn = QPushButton("Search")
@@ -104,6 +294,16 @@ class JishoDialog(QDialog):
         
         layout.addLayout(search_layout)
         
+        # Candidate list; entries are only fully parsed once selected
+        self.result_list = QListWidget()
+        self.result_list.currentRowChanged.connect(self.select_result)
+        layout.addWidget(self.result_list)
+        
+        self.more_btn = QPushButton("More Results")
+        self.more_btn.clicked.connect(self.load_more)
+        self.more_btn.setEnabled(False)
+        layout.addWidget(self.more_btn)
+        
         # Results area
         self.result_area = QTextEdit()
         self.result_area.setReadOnly(True)
@@ -124,30 +324,135 @@ class JishoDialog(QDialog):
         
         self.setLayout(layout)
         
+        # Debounce typing so only the final keyword is looked up
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(400)
+        self.debounce_timer.timeout.connect(self.search_and_fill)
+        
         self.current_data = None
     
+    def show_suggestions(self, text):
+        """List matching words from the local cache while the network search is pending"""
+        suggestions = self.importer.suggest(text.strip())
+        if not suggestions:
+            return
+        self.cancel_pending_search()
+        self.results = []
+        self.result_list.clear()
+        self.more_btn.setEnabled(False)
+        self.add_results(suggestions)
+        self.result_list.setCurrentRow(0)
+    
+    def schedule_search(self):
+        """Restart the debounce timer after each keystroke"""
+        self.debounce_timer.start()
+    
+    def cancel_pending_search(self):
+        """Drop any in-flight lookup so its result is ignored"""
+        self.search_generation += 1
+        if self.pending_search is not None:
+            self.pending_search.cancel()
+            self.pending_search = None
+    
     def search_and_fill(self):
-        """Search for word and display results"""
+        """Search for word in the background and display results"""
+        self.debounce_timer.stop()
+        self.cancel_pending_search()
+        
         word = self.search_input.text().strip()
         if not word:
+            self.search_btn.setText("Search")
             return
-            
-        self.search_btn.setEnabled(False)
+        
+        # Any local suggestions stay listed until the first page arrives
+        self.search_word = word
+        self.search_page = 1
+        self.fetch_page()
+    
+    def load_more(self):
+        """Fetch the next page of candidates for the current keyword"""
+        if not self.search_word or self.pending_search is not None:
+            return
+        self.search_page += 1
+        self.fetch_page()
+    
+    def fetch_page(self):
+        """Fetch the current page of results in the background"""
         self.search_btn.setText("Searching...")
+        self.more_btn.setEnabled(False)
+        generation = self.search_generation
+        word, page = self.search_word, self.search_page
+        
+        def on_done(results, error):
+            # A newer keyword was typed while this one was in flight
+            if generation != self.search_generation:
+                return
+            self.pending_search = None
+            if page == 1:
+                self.results = []
+                self.result_list.clear()
+            elif error:
+                # Let "More Results" retry the page that failed
+                self.search_page = page - 1
+                self.more_btn.setEnabled(True)
+            self.show_search_results(results or [], error)
         
-        # Perform search
-        data = self.importer.search_word(word)
+        self.pending_search = self.importer.run_in_background(
+            lambda: self.importer.search_results(word, page), on_done
+        )
+    
+    def show_search_results(self, results, error):
+        """Add a finished page of candidates to the list"""
+        self.search_btn.setText("Search")
+        if error:
+            if not self.results:
+                self.show_search_result(None, error)
+            return
         
+        first_new = len(self.results)
+        self.add_results(results)
+        
+        # Jisho.org returns up to 20 results per page
+        self.more_btn.setEnabled(len(results) >= 20)
+        
+        if not self.results:
+            self.show_search_result(None, None)
+        elif first_new == 0:
+            self.result_list.setCurrentRow(0)
+    
+    def add_results(self, results):
+        """Append candidates to the list"""
+        self.results.extend(results)
+        for entry in results:
+            reading = entry.get('reading', '')
+            kanji = entry.get('kanji', '')
+            self.result_list.addItem(f"{kanji} 【{reading}】" if reading and reading != kanji else kanji)
+    
+    def select_result(self, row):
+        """Show the details of the selected candidate"""
+        if 0 <= row < len(self.results):
+            self.show_search_result(self.results[row], None)
+    
+    def show_search_result(self, data, error):
+        """Display the outcome of a finished lookup"""
         if data:
             self.current_data = data
             self.display_results(data)
             self.import_btn.setEnabled(True)
         else:
-            self.result_area.setPlainText("No results found or error occurred.")
+            self.current_data = None
+            if error:
+                self.result_area.setPlainText(describe_lookup_error(error))
+            else:
+                self.result_area.setPlainText("No results found or error occurred.")
             self.import_btn.setEnabled(False)
-            
-        self.search_btn.setEnabled(True)
-        self.search_btn.setText("Search")
+    
+    def done(self, result):
+        """Stop pending lookups when the dialog closes"""
+        self.debounce_timer.stop()
+        self.cancel_pending_search()
+        super().done(result)
     
     def display_results(self, data):
         """Display search results in the text area"""
@@ -166,68 +471,46 @@ Common: {data.get('common', 'N/A')}
         """Import the current data to the note being edited"""
         if not self.current_data or not self.editor:
             return
-            
+        
+        data = self.current_data
+        if not self.importer.audio_enabled:
+            self.finish_import(self.editor.note, data)
+            return
+        
+        # Generating audio can take a moment, so it runs in the background
+        note = self.editor.note
+        self.import_btn.setEnabled(False)
+        self.import_btn.setText("Generating audio...")
+        self.importer.run_in_background(
+            lambda: self.importer.add_audio(data, best_effort=False),
+            lambda result, error: self.finish_import(note, result or data, error),
+        )
+    
+    def finish_import(self, note, data, audio_error=None):
+        """Write data into the editor's note and close the dialog"""
+        self.import_btn.setText("Import to Note")
+        if audio_error is not None:
+            print(f"Error generating audio for {data.get('kanji', '')}: {audio_error}")
+            showCritical(f"Could not generate audio: {audio_error}\n\nThe note is filled without audio.")
+        # The editor moved on to another note in the meantime
+        if self.editor.note is not note:
+            self.close()
+            return
+        
+        self.current_data = data
         # Get field mappings from config
         field_mappings = self.importer.config.get("field_mappings", {})
         
-        imported_fields = []
-        for field_name, data_key in field_mappings.items():
-            value = self.current_data.get(data_key, '')
-            if value and self.fill_field(field_name, value):
-                imported_fields.append(field_name)
+        imported_fields, elapsed = apply_to_editor(self.editor, self.current_data, field_mappings)
         
         if imported_fields:
-            tooltip(f"Imported data to fields: {', '.join(imported_fields)}")
+            tooltip(f"Imported data to fields: {', '.join(imported_fields)} ({elapsed * 1000:.0f} ms)")
+        elif resolver.resolve_note(self.editor.note, field_mappings):
+            tooltip("Note is already up to date")
         else:
             showInfo("No matching fields found in your note type. Please check the README for required field names.")
         
         self.close()
-    
-    def fill_field(self, field_name, value):
-        """Fill a specific field in the editor with fuzzy matching"""
-        try:
-            # Get all field names in the current note type
-            field_names = list(self.editor.note.keys())
-            
-            # Try exact match first (case-insensitive)
-            target_field = None
-            for fname in field_names:
-                if fname.lower() == field_name.lower():
-                    target_field = fname
-                    break
-            
-            # If no exact match, try fuzzy matching
-            if not target_field:
-                field_variations = {
-                    'japanese': ['japanese', 'word', 'kanji', 'japanese_word'],
-                    'reading': ['reading', 'kana', 'hiragana', 'pronunciation', 'furigana'],
-                    'meaning': ['meaning', 'definition', 'english', 'translation', 'definitions'],
-                    'jlpt': ['jlpt', 'jlpt_level', 'level', 'jlptlevel'],
-                    'partofspeech': ['partofspeech', 'pos', 'grammar', 'type', 'part_of_speech'],
-                    'common': ['common', 'frequency', 'popular', 'commonness']
-                }
-                
-                field_key = field_name.lower().replace('_', '').replace(' ', '')
-                if field_key in field_variations:
-                    for variant in field_variations[field_key]:
-                        for fname in field_names:
-                            if variant in fname.lower().replace('_', '').replace(' ', ''):
-                                target_field = fname
-                                break
-                        if target_field:
-                            break
-            
-            if target_field:
-                self.editor.note[target_field] = value
-                self.editor.loadNote()
-                return True
-            else:
-                print(f"Field '{field_name}' not found in note type. Available fields: {field_names}")
-                return False
-                
-        except Exception as e:
-            print(f"Error filling field {field_name}: {str(e)}")
-            return False
 
 
 def show_jisho_dialog(editor):
@@ -246,23 +529,19 @@ def show_jisho_dialog(editor):
 
 def get_japanese_field_content(editor):
     """Get content from the Japanese field if it exists"""
+    if not editor or not editor.note:
+        return None
+    return get_japanese_note_content(editor.note)
+
+
+def get_japanese_note_content(note):
+    """Get content from a note's Japanese field if it exists"""
     try:
-        if not editor or not editor.note:
-            return None
-            
-        # Get field mappings from config
-        config = load_config()
-        field_mappings = config.get("field_mappings", {})
-        japanese_data_key = field_mappings.get("Japanese", "kanji")
+        # Find the Japanese field through the compiled note type table
+        index = resolver.field_index(note, "Japanese")
         
-        # Get all field names in the current note type
-        field_names = list(editor.note.keys())
-        
-        # Try to find the Japanese field using the same fuzzy matching logic
-        target_field = find_matching_field("Japanese", field_names)
-        
-        if target_field:
-            content = editor.note[target_field]
+        if index is not None:
+            content = note.fields[index]
             return content.strip() if content else None
             
     except Exception as e:
@@ -272,29 +551,43 @@ def get_japanese_field_content(editor):
 
 
 def auto_search_and_fill(editor, word):
-    """Automatically search for word and fill fields"""
+    """Automatically search for word in the background and fill fields"""
+    # Show a brief loading message
+    tooltip("Searching Jisho.org...")
+    
+    importer = get_importer()
+    note = editor.note
+    
+    def on_done(data, error):
+        # The user moved on to another note while the lookup was running
+        if editor.note is not note:
+            return
+        if error:
+            print(f"Error in auto search and fill: {error}")
+            tooltip(f"❌ {describe_lookup_error(error)}", period=2000)
+            return
+        fill_from_result(editor, importer, data)
+    
+    return importer.lookup_in_background(word, on_done)
+
+
+def fill_from_result(editor, importer, data):
+    """Fill the editor's note with a finished lookup result"""
     try:
-        # Show a brief loading message
-        tooltip("Searching Jisho.org...")
-        
-        # Create importer and search
-        importer = JishoImporter()
-        data = importer.search_word(word)
-        
         if data:
-            # Get field mappings from config
-            field_mappings = importer.config.get("field_mappings", {})
-            
-            imported_fields = []
+            # Get field mappings from config; per-token results only fill the token fields
+            if 'tokens' in data:
+                field_mappings = importer.config.get("tokenizer", {}).get("field_mappings", {})
+            else:
+                field_mappings = importer.config.get("field_mappings", {})
             
             # Fill ALL fields including Japanese (to replace with slug)
-            for field_name, data_key in field_mappings.items():
-                value = data.get(data_key, '')
-                if value and fill_field_direct(editor, field_name, value):
-                    imported_fields.append(field_name)
+            imported_fields, elapsed = apply_to_editor(editor, data, field_mappings)
             
             if imported_fields:
-                tooltip(f"✅ Updated: {', '.join(imported_fields)}", period=3000)
+                tooltip(f"✅ Updated: {', '.join(imported_fields)} ({elapsed * 1000:.0f} ms)", period=3000)
+            elif resolver.resolve_note(editor.note, field_mappings):
+                tooltip("✅ Already up to date", period=2000)
             else:
                 tooltip("⚠️ No matching fields found for import", period=2000)
         else:
@@ -305,77 +598,45 @@ def auto_search_and_fill(editor, word):
         tooltip(f"❌ Error: {str(e)}", period=2000)
 
 
-def find_matching_field(field_name, available_fields):
-    """Find matching field using fuzzy matching - extracted from JishoDialog"""
-    # Try exact match first (case-insensitive)
-    for fname in available_fields:
-        if fname.lower() == field_name.lower():
-            return fname
-    
-    # If no exact match, try fuzzy matching
-    field_variations = {
-        'japanese': ['japanese', 'word', 'kanji', 'japanese_word'],
-        'reading': ['reading', 'kana', 'hiragana', 'pronunciation', 'furigana'],
-        'meaning': ['meaning', 'definition', 'english', 'translation', 'definitions'],
-        'jlpt': ['jlpt', 'jlpt_level', 'level', 'jlptlevel'],
-        'partofspeech': ['partofspeech', 'pos', 'grammar', 'type', 'part_of_speech'],
-        'common': ['common', 'frequency', 'popular', 'commonness']
-    }
-    
-    field_key = field_name.lower().replace('_', '').replace(' ', '')
-    if field_key in field_variations:
-        for variant in field_variations[field_key]:
-            for fname in available_fields:
-                if variant in fname.lower().replace('_', '').replace(' ', ''):
-                    return fname
-    
-    return None
+def describe_lookup_error(error):
+    """Turn a lookup exception into a user-facing message"""
+    from requests import RequestException
+    if isinstance(error, RequestException):
+        return f"Network error: {str(error)}"
+    return f"Error searching word: {str(error)}"
 
 
-def fill_field_direct(editor, field_name, value):
-    """Fill a specific field in the editor - extracted and simplified from JishoDialog"""
-    try:
-        # Get all field names in the current note type
-        field_names = list(editor.note.keys())
-        
-        # Find matching field
-        target_field = find_matching_field(field_name, field_names)
-        
-        if target_field:
-            editor.note[target_field] = value
+def apply_data_to_note(note, data, field_mappings):
+    """Write looked-up data into a note's matching fields, returning the updated field names"""
+    with stats.timer('field_resolve'):
+        table = resolver.resolve_note(note, field_mappings)
+    updated_fields = []
+    with stats.timer('note_write'):
+        for field_name, data_key in field_mappings.items():
+            value = data.get(data_key, '')
+            index = table.get(field_name)
+            if value and index is not None and note.fields[index] != value:
+                note.fields[index] = value
+                updated_fields.append(field_name)
+    return updated_fields
+
+
+def apply_to_editor(editor, data, field_mappings):
+    """Write all looked-up fields into the editor's note and reload it once
+    
+    Returns the updated field names and the time the whole apply step took.
+    """
+    started = time.perf_counter()
+    updated_fields = apply_data_to_note(editor.note, data, field_mappings)
+    if updated_fields:
+        with stats.timer('editor_reload'):
             editor.loadNote()
-            return True
-        else:
-            print(f"Field '{field_name}' not found in note type. Available fields: {field_names}")
-            return False
-            
-    except Exception as e:
-        print(f"Error filling field {field_name}: {str(e)}")
-        return False
+    return updated_fields, time.perf_counter() - started
 
 
 def load_config():
-    """Load configuration - extracted for reuse"""
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Could not load config: {e}")
-    
-    # Default configuration
-    return {
-        "field_mappings": {
-            "Japanese": "kanji",
-            "Reading": "reading",
-            "Meaning": "meanings", 
-            "JLPT": "jlpt",
-            "PartOfSpeech": "pos",
-            "Common": "common"
-        },
-        "keyboard_shortcut": "Ctrl+J"
-    }
+    """Return the cached config snapshot - extracted for reuse"""
+    return config_store.get()
 
 
 def add_jisho_button(buttons, editor):
@@ -394,25 +655,239 @@ def add_jisho_button(buttons, editor):
 def setup_shortcuts(editor):
     """Setup keyboard shortcuts"""
     # Get shortcut from config
-    try:
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        if os.path.exists(config_path):
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                shortcut_key = config.get('keyboard_shortcut', 'Ctrl+J')
-        else:
-            shortcut_key = 'Ctrl+J'
-    except:
-        shortcut_key = 'Ctrl+J'
+    shortcut_key = load_config().get('keyboard_shortcut', 'Ctrl+J')
     
     shortcut = QShortcut(QKeySequence(shortcut_key), editor.parentWindow)
     shortcut.activated.connect(lambda: show_jisho_dialog(editor))
 
 
+def get_prefetcher():
+    """Return the shared prefetcher that warms the cache while the user types"""
+    global _prefetcher
+    if _prefetcher is None:
+        from .lookup import Prefetcher
+        from .scheduler import PREFETCH, with_priority
+        remember_service_settings(load_config())
+        delay = load_config()["prefetch"].get("delay_ms", 300) / 1000
+        _prefetcher = Prefetcher(with_priority(get_importer().lookup_field, PREFETCH), delay=delay)
+    return _prefetcher
+
+
+def prefetch_note(note):
+    """Prefetch the note's Japanese word if prefetching is enabled"""
+    if not load_config()["prefetch"].get("enabled", False):
+        return
+    word = get_japanese_note_content(note)
+    if word:
+        get_prefetcher().request(word)
+    elif _prefetcher is not None:
+        _prefetcher.cancel()
+
+
+def on_typing_timer(note):
+    """Prefetch after the user pauses typing"""
+    prefetch_note(note)
+
+
+def on_unfocus_field(changed, note, field_index):
+    """Prefetch when the user leaves the Japanese field"""
+    if field_index == resolver.field_index(note, "Japanese"):
+        prefetch_note(note)
+    return changed
+
+
+def build_jmdict_index():
+    """Build the offline JMdict index from a downloaded dump"""
+    from .jmdict import build_index
+    
+    path, _ = QFileDialog.getOpenFileName(
+        mw, "Select JMdict dump", "", "JMdict (JMdict JMdict_e *.xml *.gz)"
+    )
+    if not path:
+        return
+    
+    config = load_config()
+    db_path = os.path.join(ADDON_DIR, config.get("jmdict_db", "user_files/jmdict.sqlite3"))
+    
+    def report(count):
+        mw.taskman.run_on_main(lambda: mw.progress.update(label=f"Indexed {count} entries..."))
+    
+    def on_success(count):
+        showInfo(
+            f"Indexed {count} JMdict entries.\n\n"
+            'Set "backend" to "jmdict" in the add-on config and restart Anki to use it.'
+        )
+    
+    QueryOp(
+        parent=mw, op=lambda col: build_index(path, db_path, progress=report), success=on_success
+    ).with_progress("Building offline dictionary...").run_in_background()
+
+
+def export_lookup_cache():
+    """Save the lookup cache as a snapshot file to share with other machines"""
+    cache = get_lookup_cache(load_config())
+    if cache is None:
+        showInfo("The lookup cache is disabled in the add-on config.")
+        return
+    path, _ = QFileDialog.getSaveFileName(
+        mw, "Export lookup cache", "jisho_cache.jsonl.gz", "Cache snapshot (*.jsonl.gz)"
+    )
+    if not path:
+        return
+    
+    QueryOp(
+        parent=mw,
+        op=lambda col: cache.export_snapshot(path),
+        success=lambda count: tooltip(f"Exported {count} cached lookups"),
+    ).with_progress("Exporting lookup cache...").run_in_background()
+
+
+def import_lookup_cache():
+    """Merge a snapshot exported on another machine into the lookup cache"""
+    cache = get_lookup_cache(load_config())
+    if cache is None:
+        showInfo("The lookup cache is disabled in the add-on config.")
+        return
+    path, _ = QFileDialog.getOpenFileName(
+        mw, "Import lookup cache", "", "Cache snapshot (*.jsonl.gz)"
+    )
+    if not path:
+        return
+    
+    def report(rows):
+        mw.taskman.run_on_main(lambda: mw.progress.update(label=f"Read {rows} rows..."))
+    
+    def on_success(counts):
+        imported, skipped = counts
+        showInfo(f"Imported {imported} lookups.\n{skipped} were older than the cached copies or expired.")
+    
+    QueryOp(
+        parent=mw, op=lambda col: cache.import_snapshot(path, progress=report), success=on_success
+    ).with_progress("Importing lookup cache...").run_in_background()
+
+
+class StatsDialog(QDialog):
+    """Shows lookup latency percentiles and counters"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Jisho Lookup Statistics")
+        self.setMinimumSize(560, 400)
+        
+        layout = QVBoxLayout()
+        
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        
+        self.table_text = QTextEdit()
+        self.table_text.setReadOnly(True)
+        self.table_text.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        layout.addWidget(self.table_text)
+        
+        button_layout = QHBoxLayout()
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.refresh)
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.clicked.connect(self.reset)
+        self.export_button = QPushButton("Export JSON...")
+        self.export_button.clicked.connect(self.export_json)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.refresh_button)
+        button_layout.addWidget(self.reset_button)
+        button_layout.addWidget(self.export_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        self.refresh()
+    
+    def refresh(self):
+        if stats.enabled:
+            self.status_label.setText("Collecting statistics since Anki started or the last reset.")
+        else:
+            self.status_label.setText('Collection is off. Set "stats" → "enabled" to true in the add-on config.')
+        self.table_text.setPlainText(stats.format_table() + format_queue_depths())
+    
+    def reset(self):
+        stats.reset()
+        self.refresh()
+    
+    def export_json(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export statistics", "jisho_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(stats.to_json())
+        except OSError as e:
+            showCritical(f"Could not write statistics: {e}")
+            return
+        tooltip("Statistics exported")
+
+
+def format_queue_depths():
+    """Describe the Jisho.org request queues, once the client is in use"""
+    if _jisho_client is None:
+        return ""
+    lines = ["", "", f"{'Queue':<18}{'Waiting':>8}{'Peak':>10}"]
+    for name, (waiting, peak) in _jisho_client.rate_limiter.queue_depths().items():
+        lines.append(f"{name:<18}{waiting:>8}{peak:>10}")
+    return '\n'.join(lines)
+
+
+def show_stats_dialog():
+    StatsDialog(mw).exec()
+
+
+def apply_stats_config(config):
+    """Turn statistics collection on or off from the add-on config"""
+    stats.enabled = bool(config.get("stats", {}).get("enabled", False))
+
+
+def on_config_updated(config):
+    """Apply edits from Anki's add-on config dialog without a restart"""
+    config_store.invalidate()
+    config = load_config()
+    apply_stats_config(config)
+    reset_audio_pipeline()
+    reset_tokenizer()
+    # Rebuild the lookup services only when their settings changed, so
+    # lookups in flight are not interrupted by unrelated edits
+    if _service_settings is not None and service_settings(config) != _service_settings:
+        reset_lookup_services()
+
+
+def on_main_window_init():
+    """Apply settings that need the config once Anki's main window is up"""
+    apply_stats_config(load_config())
+
+
+def setup_tools_menu():
+    """Add the add-on's actions to the Tools menu"""
+    action = QAction("Jisho: Build Offline Dictionary...", mw)
+    action.triggered.connect(build_jmdict_index)
+    mw.form.menuTools.addAction(action)
+    
+    export_action = QAction("Jisho: Export Lookup Cache...", mw)
+    export_action.triggered.connect(export_lookup_cache)
+    mw.form.menuTools.addAction(export_action)
+    
+    import_action = QAction("Jisho: Import Lookup Cache...", mw)
+    import_action.triggered.connect(import_lookup_cache)
+    mw.form.menuTools.addAction(import_action)
+    
+    stats_action = QAction("Jisho: Lookup Statistics...", mw)
+    stats_action.triggered.connect(show_stats_dialog)
+    mw.form.menuTools.addAction(stats_action)
+
+
 # Hook into Anki's editor
 gui_hooks.editor_did_init_buttons.append(add_jisho_button)
 gui_hooks.editor_did_init.append(setup_shortcuts)
-
-
-# Initialize the add-on
-jisho_importer = JishoImporter()
\ No newline at end of file
+gui_hooks.editor_did_fire_typing_timer.append(on_typing_timer)
+gui_hooks.editor_did_unfocus_field.append(on_unfocus_field)
+gui_hooks.main_window_did_init.append(setup_tools_menu)
+gui_hooks.main_window_did_init.append(on_main_window_init)
+mw.addonManager.setConfigUpdatedAction(mw.addonManager.addonFromModule(__name__), on_config_updated)
\ No newline at end of file
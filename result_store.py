@@ -0,0 +1,114 @@
+"""
+Compact in-memory store for many parsed lookup results
+Keeps the fields of parse_jisho_result dicts in typed columns: text in
+one UTF-8 arena, parts of speech and JLPT levels as small integers into
+shared tables, so a batch holding tens of thousands of results does not
+pay for one dict and six strings per word
+"""
+
+import threading
+from array import array
+from collections.abc import Mapping
+
+try:
+    from .jisho_parser import RESULT_KEYS
+except ImportError:
+    from jisho_parser import RESULT_KEYS
+
+# Columns stored as offsets into the text arena
+TEXT_KEYS = ('kanji', 'reading', 'meanings')
+
+
+class ResultStore:
+    """Append-only columnar store of parsed results"""
+
+    def __init__(self):
+        self._arena = bytearray()
+        # Arena offset where each row's text starts; row i spans _starts[i]:_starts[i + 1]
+        self._starts = array('Q', [0])
+        # Byte lengths of kanji and reading; meanings run to the end of the row
+        self._kanji_len = array('I')
+        self._reading_len = array('I')
+        self._pos = array('H')
+        self._jlpt = array('B')
+        self._common = bytearray()
+        self._pos_values, self._pos_ids = [], {}
+        self._jlpt_values, self._jlpt_ids = [], {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._common)
+
+    def _intern(self, values, ids, value):
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(values)
+            values.append(value)
+        return index
+
+    def add(self, result):
+        """Store a parsed result and return a read-only view of it"""
+        kanji = result.get('kanji', '').encode('utf-8')
+        reading = result.get('reading', '').encode('utf-8')
+        meanings = result.get('meanings', '').encode('utf-8')
+        with self._lock:
+            row = len(self._common)
+            self._arena += kanji
+            self._arena += reading
+            self._arena += meanings
+            self._starts.append(len(self._arena))
+            self._kanji_len.append(len(kanji))
+            self._reading_len.append(len(reading))
+            self._pos.append(self._intern(self._pos_values, self._pos_ids, result.get('pos', '')))
+            self._jlpt.append(self._intern(self._jlpt_values, self._jlpt_ids, result.get('jlpt', '')))
+            self._common.append(result.get('common') == 'Yes')
+        return ResultView(self, row)
+
+    def value(self, row, key):
+        """Return one field of a stored row"""
+        if key in TEXT_KEYS:
+            start = self._starts[row]
+            kanji_end = start + self._kanji_len[row]
+            reading_end = kanji_end + self._reading_len[row]
+            if key == 'kanji':
+                start, end = start, kanji_end
+            elif key == 'reading':
+                start, end = kanji_end, reading_end
+            else:
+                start, end = reading_end, self._starts[row + 1]
+            return self._arena[start:end].decode('utf-8')
+        if key == 'pos':
+            return self._pos_values[self._pos[row]]
+        if key == 'jlpt':
+            return self._jlpt_values[self._jlpt[row]]
+        if key == 'common':
+            return 'Yes' if self._common[row] else 'No'
+        raise KeyError(key)
+
+
+class ResultView(Mapping):
+    """Dict-compatible, read-only view of one stored result"""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        return self.store.value(self.row, key)
+
+    def __iter__(self):
+        return iter(RESULT_KEYS)
+
+    def __len__(self):
+        return len(RESULT_KEYS)
+
+    def __contains__(self, key):
+        return key in RESULT_KEYS
+
+    def to_dict(self):
+        return {key: self[key] for key in RESULT_KEYS}
+
+    def __repr__(self):
+        return f"ResultView({self.to_dict()!r})"
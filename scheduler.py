@@ -0,0 +1,164 @@
+"""
+Priority scheduling of rate-limited Jisho.org requests
+Interactive lookups (Ctrl+J, the search dialog) are served before
+prefetches, and prefetches before bulk traffic (batch fills, the
+enricher), so a long batch never delays the word the user is waiting on
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from .stats import stats
+except ImportError:
+    from stats import stats
+
+INTERACTIVE = 'interactive'
+PREFETCH = 'prefetch'
+BULK = 'bulk'
+
+# Priority classes, most urgent first
+PRIORITY_CLASSES = (INTERACTIVE, PREFETCH, BULK)
+_RANKS = {name: rank for rank, name in enumerate(PRIORITY_CLASSES)}
+
+FAIRNESS_MODES = ('round_robin', 'fifo')
+
+_current = threading.local()
+_job_ids = itertools.count(1)
+
+
+@contextmanager
+def priority(name, job=None):
+    """Run the requests made by this thread inside the block at a priority
+
+    job groups the requests of one batch run so that concurrent runs can
+    be served fairly. Requests made outside any block are interactive.
+    """
+    if name not in _RANKS:
+        raise ValueError(f"Unknown priority class: {name}")
+    previous = getattr(_current, 'value', None)
+    _current.value = (name, job)
+    try:
+        yield
+    finally:
+        _current.value = previous
+
+
+def current_priority():
+    """Return (priority class, job) of the calling thread"""
+    return getattr(_current, 'value', None) or (INTERACTIVE, None)
+
+
+def with_priority(fn, name, job=None):
+    """Wrap fn so that it always runs at the given priority, on any thread"""
+    def wrapper(*args, **kwargs):
+        with priority(name, job):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def new_job(label):
+    """Return a fresh job id for one batch run"""
+    return f"{label}-{next(_job_ids)}"
+
+
+class _Ticket:
+    __slots__ = ('rank', 'job', 'seq', 'enqueued')
+
+    def __init__(self, rank, job, seq, enqueued):
+        self.rank = rank
+        self.job = job
+        self.seq = seq
+        self.enqueued = enqueued
+
+
+class PriorityScheduler:
+    """Token-bucket rate limiter that grants requests in priority order
+
+    Waiting requests are served strictly by class. Within a class,
+    "round_robin" fairness alternates between jobs and "fifo" serves
+    requests in arrival order. Interactive requests may borrow up to
+    interactive_reserve tokens beyond an empty bucket; the debt is paid
+    back by the background traffic after them, so the average rate still
+    holds.
+    """
+
+    def __init__(self, rate, burst, interactive_reserve=2, fairness='round_robin'):
+        if fairness not in FAIRNESS_MODES:
+            raise ValueError(f"Unknown fairness mode: {fairness}")
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.interactive_reserve = max(interactive_reserve, 0)
+        self.fairness = fairness
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._grants = itertools.count(1)
+        # When each job was last served, for round-robin fairness; a job
+        # that was never served goes first. One entry per batch run.
+        self._last_served = {}
+        self._peaks = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _order(self, ticket):
+        if self.fairness == 'round_robin':
+            return (ticket.rank, self._last_served.get(ticket.job, 0), ticket.seq)
+        return (ticket.rank, ticket.seq)
+
+    def acquire(self):
+        """Block until a request at the calling thread's priority may be sent"""
+        if not self.rate:
+            return
+        name, job = current_priority()
+        rank = _RANKS[name]
+        floor = 1 - self.interactive_reserve if name == INTERACTIVE else 1
+
+        with self._condition:
+            ticket = _Ticket(rank, job, next(self._seq), time.monotonic())
+            self._waiting.append(ticket)
+            depth = sum(1 for waiting in self._waiting if waiting.rank == rank)
+            self._peaks[name] = max(self._peaks[name], depth)
+            # A more urgent request may change who is next in line
+            self._condition.notify_all()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self.blocked_until:
+                        wait = self.blocked_until - now
+                    elif min(self._waiting, key=self._order) is not ticket:
+                        # Woken when the request ahead of this one is granted
+                        wait = None
+                    elif self.tokens >= floor:
+                        self.tokens -= 1
+                        self._last_served[job] = next(self._grants)
+                        break
+                    else:
+                        wait = (floor - self.tokens) / self.rate
+                    self._condition.wait(wait)
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+        stats.record(f"wait_{name}", time.monotonic() - ticket.enqueued)
+
+    def block_for(self, seconds):
+        """Hold back all requests, e.g. after a Retry-After response"""
+        with self._condition:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def queue_depths(self):
+        """Return {priority class: (requests waiting now, most ever waiting)}"""
+        with self._condition:
+            return {
+                name: (sum(1 for ticket in self._waiting if ticket.rank == rank), self._peaks[name])
+                for name, rank in _RANKS.items()
+            }
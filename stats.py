@@ -0,0 +1,145 @@
+"""
+Lightweight lookup instrumentation
+Collects per-stage latencies and event counters; when disabled every
+call returns immediately so the hot path pays next to nothing
+"""
+
+import json
+import math
+import threading
+import time
+from collections import deque
+
+# Stages in the order they happen during a lookup, used for display
+STAGES = (
+    'config_load', 'lookup', 'cache_check', 'suggest', 'wait_interactive', 'wait_prefetch',
+    'wait_bulk', 'http_request', 'http_headers', 'http_transfer', 'json_decode', 'parse',
+    'field_resolve', 'note_write', 'editor_reload',
+)
+
+
+class _NullTimer:
+    """Context manager that does nothing, shared by all disabled timers"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('stats', 'stage', 'started')
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of already sorted samples"""
+    if not sorted_samples:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+
+class Stats:
+    """Per-stage latency samples and counters"""
+
+    def __init__(self, enabled=False, max_samples=2048):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        """Return a context manager timing one stage"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, stage)
+
+    def record(self, stage, seconds):
+        """Record one latency sample in seconds"""
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.max_samples)
+                self._totals[stage] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[stage]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name, amount=1):
+        """Increment an event counter"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Return latency percentiles (in milliseconds) and counters"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            totals = {stage: tuple(values) for stage, values in self._totals.items()}
+            counters = dict(self._counters)
+
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        stages = {}
+        for stage in sorted(samples, key=lambda name: (order.get(name, len(order)), name)):
+            values = samples[stage]
+            count, total = totals[stage]
+            stages[stage] = {
+                'count': count,
+                'mean_ms': total / count * 1000 if count else 0.0,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'max_ms': values[-1] * 1000 if values else 0.0,
+            }
+        return {'stages': stages, 'counters': counters}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def format_table(self):
+        """Render the snapshot as fixed-width text"""
+        snapshot = self.snapshot()
+        lines = [f"{'Stage':<18}{'Count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Max ms':>10}"]
+        for stage, row in snapshot['stages'].items():
+            lines.append(
+                f"{stage:<18}{row['count']:>8}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}"
+            )
+        if snapshot['counters']:
+            lines.append("")
+            for name, value in sorted(snapshot['counters'].items()):
+                lines.append(f"{name:<26}{value:>8}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+stats = Stats()
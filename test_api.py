@@ -7,13 +7,15 @@ without needing to install the add-on in Anki first.
 
 import json
 import requests
-from urllib.parse import quote
+from field_resolver import find_matching_field
+from jisho_client import JishoClient
 from jisho_parser import parse_jisho_result
 
 def test_jisho_api():
     """Test the Jisho.org API with sample words"""
     
     test_words = ["猫", "食べる", "美しい", "こんにちは", "arigatou"]
+    client = JishoClient()
     
     print("🧪 Testing Jisho.org API Integration")
     print("=" * 50)
@@ -24,11 +26,7 @@ def test_jisho_api():
         
         try:
             # Make API request
-            url = f"https://jisho.org/api/v1/search/words?keyword={quote(word)}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = client.search(word)
             
             if not data.get('data'):
                 print("❌ No results found")
@@ -95,32 +93,6 @@ def test_field_mapping():
         else:
             print("   ❌ FAIL")
 
-def find_matching_field(target_field, available_fields):
-    """Simulate the field matching logic from the add-on"""
-    # Try exact match first (case-insensitive)
-    for field_name in available_fields:
-        if field_name.lower() == target_field.lower():
-            return field_name
-    
-    # Try fuzzy matching
-    field_variations = {
-        'japanese': ['japanese', 'word', 'kanji', 'japanese_word'],
-        'reading': ['reading', 'kana', 'hiragana', 'pronunciation', 'furigana'],
-        'meaning': ['meaning', 'definition', 'english', 'translation', 'definitions'],
-        'jlpt': ['jlpt', 'jlpt_level', 'level', 'jlptlevel'],
-        'partofspeech': ['partofspeech', 'pos', 'grammar', 'type', 'part_of_speech'],
-        'common': ['common', 'frequency', 'popular', 'commonness']
-    }
-    
-    field_key = target_field.lower().replace('_', '').replace(' ', '')
-    if field_key in field_variations:
-        for variant in field_variations[field_key]:
-            for field_name in available_fields:
-                if variant in field_name.lower().replace('_', '').replace(' ', ''):
-                    return field_name
-    
-    return None
-
 if __name__ == "__main__":
     # Test API functionality
     try:
@@ -0,0 +1,16 @@
+"""
+pytest plugin that collects the add-on folder as a plain directory
+Its __init__.py imports Anki, so pytest must not import it as a package
+"""
+
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_collect_directory(path, parent):
+    if str(path) == ROOT:
+        return pytest.Dir.from_parent(parent, path=path)
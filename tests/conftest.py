@@ -0,0 +1,145 @@
+"""
+Shared fixtures for the offline test suite
+Serves recorded Jisho.org responses from a local HTTP server so that
+no test touches the network
+"""
+
+import glob
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+
+
+def load_fixtures():
+    """Return {keyword: response} for every recorded response"""
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.json'))):
+        with open(path, encoding='utf-8') as f:
+            recorded = json.load(f)
+        fixtures[recorded['keyword']] = recorded['response']
+    return fixtures
+
+
+@pytest.fixture(scope='session')
+def responses():
+    return load_fixtures()
+
+
+@pytest.fixture(scope='session')
+def raw_entries(responses):
+    """All recorded result entries"""
+    return [entry for response in responses.values() for entry in response['data']]
+
+
+class StandInServer:
+    """Local stand-in for the Jisho.org search API and an audio endpoint"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+        self.audio_requests = []
+        # Status codes to return before answering normally, e.g. [503, 429]
+        self.failures = []
+        self.retry_after = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/audio':
+                    self.send_audio(query.get('text', [''])[0])
+                    return
+
+                keyword = query.get('keyword', [''])[0]
+                server.requests.append(keyword)
+
+                if server.failures:
+                    status = server.failures.pop(0)
+                    self.send_response(status)
+                    if server.retry_after is not None:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                response = server.responses.get(keyword, {'meta': {'status': 200}, 'data': []})
+                if int(query.get('page', ['1'])[0]) > 1:
+                    response = {'meta': {'status': 200}, 'data': []}
+                body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_audio(self, text):
+                server.audio_requests.append(text)
+                body = f"AUDIO:{text}".encode('utf-8')
+                self.send_response(200 if text else 404)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api/v1/search/words"
+        self.audio_url = f"http://127.0.0.1:{self.httpd.server_port}/audio?text={{text}}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def jisho_server(responses):
+    server = StandInServer(responses)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(jisho_server):
+    """JishoClient pointed at the stand-in server with fast retries"""
+    from jisho_client import JishoClient
+
+    client = JishoClient(backoff_base=0.001, rate_limit_per_sec=0, breaker_cooldown=60)
+    client.api_url = jisho_server.url
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from lookup_cache import LookupCache
+
+    cache = LookupCache(str(tmp_path / 'lookup_cache.sqlite3'))
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def filled_cache(client, cache, responses):
+    """Lookup cache holding every recorded response"""
+    from backends import JishoApiBackend
+    from lookup import WordLookup
+
+    lookups = WordLookup(JishoApiBackend(client), cache)
+    for keyword in responses:
+        lookups.lookup(keyword)
+    return cache
@@ -0,0 +1,139 @@
+"""Tests for the audio pipeline with a stand-in TTS command and audio server"""
+
+import os
+import sys
+
+import pytest
+
+from audio import (
+    AudioError, AudioPipeline, CommandSource, HttpSource, audio_text, create_audio_source, sound_tag,
+    with_audio,
+)
+from jisho_parser import JishoEntry
+
+# Stand-in TTS engines: write "AUDIO:<text>" to the output file or to stdout
+FILE_TTS = [
+    sys.executable, '-c',
+    "import sys, time; time.sleep(0.05); open(sys.argv[1], 'wb').write(('AUDIO:' + sys.argv[2]).encode())",
+    '{output}', '{text}',
+]
+STDIN_TTS = [sys.executable, '-c', "import sys; sys.stdout.buffer.write(b'AUDIO:' + sys.stdin.buffer.read())"]
+
+
+def read_media(media_dir, name):
+    with open(os.path.join(media_dir, name), 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def test_command_source_output_file_and_stdin():
+    assert CommandSource(FILE_TTS).fetch('ねこ') == 'AUDIO:ねこ'.encode('utf-8')
+    assert CommandSource(STDIN_TTS).fetch('ねこ') == 'AUDIO:ねこ'.encode('utf-8')
+
+
+def test_command_source_errors():
+    with pytest.raises(AudioError):
+        CommandSource(['this-tts-command-does-not-exist', '{text}']).fetch('ねこ')
+    with pytest.raises(AudioError):
+        CommandSource([sys.executable, '-c', 'raise SystemExit(1)']).fetch('ねこ')
+
+
+def test_http_source(jisho_server):
+    source = HttpSource(jisho_server.audio_url)
+    assert source.fetch('ねこ') == 'AUDIO:ねこ'.encode('utf-8')
+    assert jisho_server.audio_requests == ['ねこ']
+    with pytest.raises(AudioError):
+        source.fetch('')
+
+
+def test_files_are_addressed_by_source_and_text(tmp_path):
+    pipeline = AudioPipeline(CommandSource(FILE_TTS), str(tmp_path))
+    name = pipeline.ensure('ねこ')
+    assert name == pipeline.filename('ねこ') and name.endswith('.wav')
+    assert read_media(tmp_path, name) == 'AUDIO:ねこ'
+    assert pipeline.filename('いぬ') != name
+    assert AudioPipeline(CommandSource(STDIN_TTS), str(tmp_path)).filename('ねこ') != name
+
+    # Existing files are reused, also by a new pipeline over the same folder
+    assert pipeline.ensure('ねこ') == name
+    again = AudioPipeline(CommandSource(FILE_TTS), str(tmp_path))
+    assert again.ensure('ねこ') == name
+    assert pipeline.generated == 1 and again.generated == 0
+
+
+def test_ensure_many_deduplicates(jisho_server, tmp_path):
+    pipeline = AudioPipeline(HttpSource(jisho_server.audio_url), str(tmp_path), max_workers=4)
+    texts = ['ねこ', 'たべる', 'ねこ', 'うつくしい'] * 5
+    files, failures = pipeline.ensure_many(texts)
+    pipeline.close()
+
+    assert failures == 0
+    assert set(files) == {'ねこ', 'たべる', 'うつくしい'}
+    assert sorted(jisho_server.audio_requests) == sorted(files)
+    assert sorted(os.listdir(tmp_path)) == sorted(files.values())
+
+
+def test_concurrent_requests_share_one_generation(tmp_path):
+    pipeline = AudioPipeline(CommandSource(FILE_TTS), str(tmp_path), max_workers=4)
+    futures = [pipeline.submit('ねこ') for _ in range(8)]
+    assert {future.result() for future in futures} == {pipeline.filename('ねこ')}
+    assert pipeline.generated == 1
+    pipeline.close()
+
+
+def test_files_go_through_the_media_writer(tmp_path):
+    written = {}
+
+    def write(name, data):
+        # Anki's media manager may store a file under another name
+        written[name] = data
+        return f"renamed-{name}"
+
+    pipeline = AudioPipeline(CommandSource(STDIN_TTS), str(tmp_path), write=write)
+    assert pipeline.ensure('ねこ') == f"renamed-{pipeline.filename('ねこ')}"
+    assert written == {pipeline.filename('ねこ'): 'AUDIO:ねこ'.encode('utf-8')}
+    assert os.listdir(tmp_path) == []
+
+
+def test_failures_are_counted(tmp_path):
+    pipeline = AudioPipeline(CommandSource([sys.executable, '-c', 'raise SystemExit(1)']), str(tmp_path))
+    files, failures = pipeline.ensure_many(['ねこ', 'いぬ'])
+    pipeline.close()
+    assert files == {} and failures == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_create_audio_source():
+    source = create_audio_source({'audio': {'source': 'tts', 'tts_command': STDIN_TTS}})
+    assert isinstance(source, CommandSource) and source.command == STDIN_TTS
+    assert create_audio_source({'audio': {}}).command == CommandSource.default_command()
+    source = create_audio_source({'audio': {'source': 'http', 'http_url': 'http://localhost/{text}'}})
+    assert isinstance(source, HttpSource) and source.extension == 'mp3'
+    with pytest.raises(AudioError):
+        create_audio_source({'audio': {'source': 'http'}})
+
+
+def test_helpers():
+    assert audio_text({'kanji': '猫', 'reading': 'ねこ'}) == 'ねこ'
+    assert audio_text({'kanji': 'ねこ', 'reading': ''}) == 'ねこ'
+    assert sound_tag('jisho_abc.wav') == '[sound:jisho_abc.wav]'
+
+
+def test_with_audio_accepts_search_entries(responses, tmp_path):
+    pipeline = AudioPipeline(CommandSource(STDIN_TTS, extension='txt'), str(tmp_path))
+    entry = JishoEntry(responses['猫']['data'][0])
+
+    data = with_audio(pipeline, entry)
+
+    assert data == dict(entry.to_dict(), audio=sound_tag(pipeline.filename('ねこ')))
+    assert read_media(tmp_path, pipeline.filename('ねこ')) == 'AUDIO:ねこ'
+    # Per-token results have no single reading to pronounce
+    tokens = {'tokens': '猫<br>犬'}
+    assert with_audio(pipeline, tokens) is tokens
+    assert with_audio(pipeline, None) is None
+
+
+def test_with_audio_raises_source_errors(tmp_path):
+    pipeline = AudioPipeline(CommandSource([sys.executable, '-c', 'raise SystemExit(1)']), str(tmp_path))
+
+    with pytest.raises(AudioError):
+        with_audio(pipeline, {'kanji': '猫', 'reading': 'ねこ'})
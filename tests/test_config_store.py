@@ -0,0 +1,54 @@
+"""Tests for config validation"""
+
+import json
+
+from audio import create_audio_source
+from config_store import DEFAULT_CONFIG, SCHEMA, ConfigStore, validate_config
+from conftest import ROOT
+from jisho_client import JishoClient
+from scheduler import FAIRNESS_MODES
+from tokenizer import ANALYZERS
+
+
+def test_defaults_match_config_json():
+    with open(f"{ROOT}/config.json", encoding='utf-8') as f:
+        assert json.load(f) == DEFAULT_CONFIG
+    assert validate_config(DEFAULT_CONFIG) == (DEFAULT_CONFIG, [])
+
+
+def test_invalid_values_fall_back_to_defaults():
+    merged, problems = validate_config({
+        'scheduler': {'fairness': 'lifo'},
+        'tokenizer': {'analyzer': 'kuromoji'},
+        'audio': {'source': 'ftp'},
+        'backend': 'weblio',
+        'cache': {'ttl_days': 'forever'},
+    })
+
+    assert merged['scheduler']['fairness'] == 'round_robin'
+    assert merged['tokenizer']['analyzer'] == 'auto'
+    assert merged['audio']['source'] == 'tts'
+    assert merged['backend'] == 'jisho'
+    assert merged['cache']['ttl_days'] == 30
+    assert len(problems) == 5
+    assert 'scheduler.fairness must be one of round_robin, fifo' in problems
+    # The merged config builds the services without errors
+    JishoClient.from_config(merged).close()
+    create_audio_source(merged)
+
+
+def test_choices_match_implementations():
+    assert set(SCHEMA['scheduler']['fairness'].values) == set(FAIRNESS_MODES)
+    assert set(SCHEMA['tokenizer']['analyzer'].values) == set(ANALYZERS) | {'auto'}
+
+
+def test_meta_json_overrides(tmp_path):
+    config_path = tmp_path / 'config.json'
+    meta_path = tmp_path / 'meta.json'
+    config_path.write_text(json.dumps({'backend': 'jmdict'}), encoding='utf-8')
+    meta_path.write_text(json.dumps({'config': {'scheduler': {'fairness': 'fifo'}}}), encoding='utf-8')
+
+    config = ConfigStore(str(config_path), str(meta_path)).get()
+
+    assert config['backend'] == 'jmdict'
+    assert config['scheduler']['fairness'] == 'fifo'
@@ -0,0 +1,36 @@
+"""Tests for the command-line enricher"""
+
+import json
+
+import jisho_client
+import enrich
+
+
+def test_enrich_keeps_input_order_and_resumes(jisho_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(jisho_client, 'JISHO_API_URL', jisho_server.url)
+    words = ['猫', '食べる', '', '美しい', 'zzzz', 'こんにちは', 'arigatou']
+    source = tmp_path / 'words.txt'
+    source.write_text('\n'.join(words) + '\n', encoding='utf-8')
+    output = tmp_path / 'enriched.jsonl'
+    cache = str(tmp_path / 'cache.sqlite3')
+
+    enrich.main([str(source), str(output), '--cache', cache])
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+
+    assert [record['input'] for record in records] == [[word] for word in words]
+    assert records[0]['reading'] == 'ねこ'
+    assert records[4]['kanji'] == ''
+
+    # Interrupt after three rows, leaving a partly written line behind
+    lines = output.read_text(encoding='utf-8').splitlines(keepends=True)
+    kept = ''.join(lines[:3])
+    output.write_text(kept + '{"partial', encoding='utf-8')
+    (tmp_path / 'enriched.jsonl.checkpoint').write_text(
+        json.dumps({'rows': 3, 'offset': len(kept.encode('utf-8'))})
+    )
+
+    enrich.main([str(source), str(output), '--cache', cache, '--resume'])
+
+    resumed = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert resumed == records
+    assert not (tmp_path / 'enriched.jsonl.checkpoint').exists()
@@ -0,0 +1,61 @@
+"""Tests and benchmarks for field_resolver"""
+
+import pytest
+
+from field_resolver import FieldResolver, find_matching_field
+
+MAPPED_FIELDS = ('Japanese', 'Reading', 'Meaning', 'JLPT', 'PartOfSpeech', 'Common')
+
+NOTE_TYPES = [
+    ['Japanese', 'Reading', 'Meaning', 'JLPT', 'PartOfSpeech', 'Common'],
+    ['Word', 'Kana', 'Definition', 'Level', 'Grammar', 'Frequency', 'Audio'],
+    ['Vocab_Japanese', 'Vocab Furigana', 'English Translation', 'Notes'],
+    ['Front', 'Back', 'Extra'],
+]
+
+
+@pytest.mark.parametrize('available, target, expected', [
+    (['Japanese', 'Reading', 'Meaning', 'JLPT'], 'Japanese', 'Japanese'),
+    (['Word', 'Kana', 'Definition', 'Level'], 'Japanese', 'Word'),
+    (['Front', 'Back', 'Extra'], 'Japanese', None),
+    (['japanese word', 'reading'], 'Reading', 'reading'),
+    (['Vocab Furigana'], 'Reading', 'Vocab Furigana'),
+    (['Part_Of_Speech'], 'PartOfSpeech', 'Part_Of_Speech'),
+])
+def test_find_matching_field(available, target, expected):
+    assert find_matching_field(target, available) == expected
+
+
+def notetype(ntid, fields, mod=1):
+    return {'id': ntid, 'mod': mod, 'flds': [{'name': name} for name in fields]}
+
+
+def test_resolver_compiles_field_indexes():
+    table = FieldResolver().resolve(notetype(1, NOTE_TYPES[1]), MAPPED_FIELDS)
+
+    assert table == {
+        'Japanese': 0, 'Reading': 1, 'Meaning': 2, 'JLPT': 3, 'PartOfSpeech': 4, 'Common': 5,
+    }
+
+
+def test_resolver_recompiles_when_note_type_changes():
+    resolver = FieldResolver()
+    assert resolver.resolve(notetype(1, ['Front', 'Back']), MAPPED_FIELDS) == {}
+
+    table = resolver.resolve(notetype(1, ['Japanese', 'Back'], mod=2), MAPPED_FIELDS)
+
+    assert table == {'Japanese': 0}
+    assert len(resolver._tables) == 1
+
+
+def test_bench_resolve_cached(benchmark):
+    resolver = FieldResolver()
+    note_types = [notetype(i, fields) for i, fields in enumerate(NOTE_TYPES)] * 250
+
+    benchmark(lambda: [resolver.resolve(nt, MAPPED_FIELDS) for nt in note_types])
+
+
+def test_bench_find_matching_field_uncached(benchmark):
+    benchmark(lambda: [
+        find_matching_field(name, fields) for fields in NOTE_TYPES * 250 for name in MAPPED_FIELDS
+    ])
@@ -0,0 +1,57 @@
+"""Tests and benchmarks for the sidecar index of filled notes"""
+
+import time
+
+import pytest
+
+from fill_index import FillIndex, note_fingerprint, result_hash
+
+TABLE = {'Japanese': 0, 'Reading': 1, 'Meaning': 2}
+
+
+@pytest.fixture
+def fill_index(tmp_path):
+    index = FillIndex(str(tmp_path / 'fill_index.sqlite3'))
+    yield index
+    index.close()
+
+
+def test_fingerprint_covers_mapped_fields_only():
+    fields = ['猫', 'ねこ', 'cat', 'my own notes']
+    fingerprint = note_fingerprint(fields, TABLE)
+    assert note_fingerprint(fields[:3] + ['edited notes'], TABLE) == fingerprint
+    assert note_fingerprint(['猫', 'ねこ', 'cat; kitty', 'my own notes'], TABLE) != fingerprint
+    # Field order in the note type does not matter, only the name/value pairs
+    assert note_fingerprint(['cat', 'ねこ', '猫'], {'Japanese': 2, 'Reading': 1, 'Meaning': 0}) == fingerprint
+
+
+def test_result_hash():
+    result = {'kanji': '猫', 'reading': 'ねこ'}
+    assert result_hash(result) == result_hash(dict(result))
+    assert result_hash(result) != result_hash({'kanji': '猫', 'reading': 'ネコ'})
+    assert result_hash(None) is None
+
+
+def test_record_and_load(fill_index):
+    fill_index.record([(1, '猫', 'f1', 'h1'), (2, 'zzzz', 'f2', None)])
+    assert fill_index.load([1, 2, 3]) == {1: ('猫', 'f1', 'h1', True), 2: ('zzzz', 'f2', None, True)}
+
+    fill_index.record([(1, '猫', 'f1b', 'h1')])
+    assert fill_index.load([1]) == {1: ('猫', 'f1b', 'h1', True)}
+
+    fill_index.clear()
+    assert fill_index.load([1, 2]) == {}
+
+
+def test_old_entries_are_stale(tmp_path, monkeypatch):
+    index = FillIndex(str(tmp_path / 'fill_index.sqlite3'), max_age_days=1)
+    index.record([(1, '猫', 'f1', 'h1')])
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 2 * 86400)
+    assert index.load([1]) == {1: ('猫', 'f1', 'h1', False)}
+    index.close()
+
+
+def test_bench_load_10k(benchmark, fill_index):
+    fill_index.record((nid, f"word{nid}", f"f{nid}", f"h{nid}") for nid in range(10000))
+    assert len(benchmark(fill_index.load, range(10000))) == 10000
@@ -0,0 +1,124 @@
+"""Tests for the offline JMdict backend against a small dump"""
+
+import gzip
+
+import pytest
+
+from jmdict import PAGE_SIZE, JMdictBackend, build_index
+
+# Shaped like the real dump: POS values are entities declared in the DOCTYPE
+JMDICT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE JMdict [
+<!ELEMENT JMdict (entry*)>
+<!ENTITY n "noun (common) (futsuumeishi)">
+<!ENTITY v1 "Ichidan verb">
+<!ENTITY vt "transitive verb">
+<!ENTITY adj-i "adjective (keiyoushi)">
+]>
+<JMdict>
+<entry><ent_seq>1</ent_seq>
+<k_ele><keb>紙</keb></k_ele>
+<r_ele><reb>かみ</reb></r_ele>
+<sense><pos>&n;</pos><gloss>paper</gloss></sense>
+</entry>
+<entry><ent_seq>2</ent_seq>
+<k_ele><keb>神</keb><ke_pri>news1</ke_pri></k_ele>
+<r_ele><reb>かみ</reb><re_pri>news1</re_pri></r_ele>
+<sense><pos>&n;</pos><gloss>god</gloss><gloss xml:lang="ger">Gott</gloss></sense>
+</entry>
+<entry><ent_seq>3</ent_seq>
+<k_ele><keb>食べる</keb><ke_pri>ichi1</ke_pri></k_ele>
+<k_ele><keb>喰べる</keb></k_ele>
+<r_ele><reb>たべる</reb><re_pri>ichi1</re_pri></r_ele>
+<sense><pos>&v1;</pos><pos>&vt;</pos><gloss>to eat</gloss></sense>
+</entry>
+<entry><ent_seq>4</ent_seq>
+<k_ele><keb>高い</keb><ke_pri>ichi1</ke_pri></k_ele>
+<r_ele><reb>たかい</reb></r_ele>
+<sense><pos>&adj-i;</pos><gloss>high</gloss><gloss>expensive</gloss></sense>
+</entry>
+<entry><ent_seq>5</ent_seq>
+<r_ele><reb>ほげ</reb></r_ele>
+<sense><pos>&n;</pos><gloss>placeholder</gloss></sense>
+</entry>
+{filler}
+</JMdict>
+"""
+
+# Enough uncommon entries read さく to need a second page
+FILLER = 25
+
+
+def filler_entries():
+    return '\n'.join(
+        f"<entry><ent_seq>{100 + n}</ent_seq><k_ele><keb>作{n}</keb></k_ele>"
+        f"<r_ele><reb>さく</reb></r_ele><sense><pos>&n;</pos><gloss>filler {n}</gloss></sense></entry>"
+        for n in range(FILLER)
+    )
+
+
+@pytest.fixture
+def jmdict(tmp_path):
+    # Compressed like the published JMdict_e.gz
+    xml_path = tmp_path / 'JMdict_e.gz'
+    with gzip.open(xml_path, 'wt', encoding='utf-8') as f:
+        f.write(JMDICT_XML.replace('{filler}', filler_entries()))
+    db_path = str(tmp_path / 'jmdict.sqlite3')
+    assert build_index(str(xml_path), db_path) == 5 + FILLER
+    backend = JMdictBackend(db_path)
+    yield backend
+    backend.close()
+
+
+def test_lookup_by_kanji_and_kana(jmdict):
+    by_kanji, _ = jmdict.lookup('食べる')
+    by_kana, _ = jmdict.lookup('たべる')
+    by_variant, _ = jmdict.lookup('喰べる')
+
+    assert by_kanji == by_kana == by_variant == {
+        'kanji': '食べる',
+        'reading': 'たべる',
+        'meanings': 'to eat',
+        'pos': 'Ichidan verb, Transitive verb',
+        'jlpt': '',
+        'common': 'Yes',
+    }
+    assert jmdict.lookup(' 高い ')[0]['meanings'] == 'high; expensive'
+    assert jmdict.lookup('zzzz') == (None, None)
+
+
+def test_entities_expand_to_pos_labels(jmdict):
+    assert jmdict.lookup('紙')[0]['pos'] == 'Noun'
+    assert jmdict.lookup('高い')[0]['pos'] == 'I-adjective (keiyoushi)'
+
+
+def test_kana_only_entries(jmdict):
+    result, _ = jmdict.lookup('ほげ')
+    assert result['kanji'] == 'ほげ'
+    assert result['reading'] == 'ほげ'
+    assert result['common'] == 'No'
+
+
+def test_search_ranks_common_entries_first(jmdict):
+    results = jmdict.search('かみ')
+    # 神 is common, so it beats 紙 although 紙 comes first in the dump
+    assert [result['kanji'] for result in results] == ['神', '紙']
+    assert [result['common'] for result in results] == ['Yes', 'No']
+    # Only English glosses are kept
+    assert results[0]['meanings'] == 'god'
+
+
+def test_search_pages(jmdict):
+    first = jmdict.search('さく')
+    second = jmdict.search('さく', page=2)
+
+    assert len(first) == PAGE_SIZE
+    assert len(second) == FILLER - PAGE_SIZE
+    # Equal rank falls back to dump order, so pages neither overlap nor skip
+    assert [result['kanji'] for result in first + second] == [f"作{n}" for n in range(FILLER)]
+    assert jmdict.search('さく', page=3) == []
+
+
+def test_missing_index(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        JMdictBackend(str(tmp_path / 'missing.sqlite3'))
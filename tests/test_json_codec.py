@@ -0,0 +1,45 @@
+"""Tests and benchmarks for JSON decoding of Jisho.org responses"""
+
+import json
+
+import pytest
+
+import json_codec
+
+
+@pytest.fixture(scope='module')
+def payload(raw_entries):
+    """A full 20-entry page encoded the way Jisho.org sends it"""
+    data = [raw_entries[n % len(raw_entries)] for n in range(20)]
+    return json.dumps({'meta': {'status': 200}, 'data': data}, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def codec(request, monkeypatch):
+    if request.param == 'orjson':
+        if json_codec.orjson is None:
+            pytest.skip("orjson is not installed")
+    else:
+        monkeypatch.setattr(json_codec, 'orjson', None)
+    return json_codec
+
+
+def test_round_trip(codec, payload):
+    decoded = codec.loads(payload)
+    assert decoded == json.loads(payload)
+    assert codec.loads(codec.dumps(decoded)) == decoded
+    assert '猫' in codec.dumps(decoded)
+
+
+def test_invalid_json_raises_value_error(codec):
+    with pytest.raises(ValueError):
+        codec.loads(b'{"data": [')
+
+
+def test_bench_decode(benchmark, codec, payload):
+    assert len(benchmark(codec.loads, payload)['data']) == 20
+
+
+def test_bench_encode(benchmark, codec, payload):
+    data = json.loads(payload)['data']
+    assert benchmark(codec.dumps, data)
@@ -0,0 +1,195 @@
+"""Tests and benchmarks for the HTTP client, cache and lookup pipeline"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from backends import JishoApiBackend
+from jisho_client import CircuitOpenError
+from lookup import Prefetcher, WordLookup, lookup_many
+from lookup_cache import normalize_keyword
+
+WORDS = ['猫', '食べる', '美しい', 'こんにちは', 'arigatou']
+
+
+def test_client_search(client, jisho_server):
+    data = client.search('猫')
+
+    assert data['data'][0]['slug'] == '猫'
+    assert jisho_server.requests == ['猫']
+
+
+def test_client_retries_transient_errors(client, jisho_server):
+    jisho_server.failures = [503, 429]
+
+    assert client.search('猫')['data']
+    assert len(jisho_server.requests) == 3
+
+
+def test_client_gives_up_after_max_retries(client, jisho_server):
+    client.max_retries = 1
+    jisho_server.failures = [503, 503, 503]
+
+    with pytest.raises(requests.HTTPError):
+        client.search('猫')
+    assert len(jisho_server.requests) == 2
+
+
+def test_circuit_breaker_fails_fast(client, jisho_server):
+    client.max_retries = 0
+    client.breaker.threshold = 2
+    jisho_server.failures = [500, 500, 500]
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.search('猫')
+    with pytest.raises(CircuitOpenError):
+        client.search('猫')
+    assert len(jisho_server.requests) == 2
+
+
+def test_lookup_uses_cache(client, cache, jisho_server):
+    lookups = WordLookup(JishoApiBackend(client), cache)
+
+    first = lookups.lookup('猫')
+    second = lookups.lookup(' 猫 ')
+
+    assert first == second
+    assert first['reading'] == 'ねこ'
+    assert jisho_server.requests == ['猫']
+    assert cache.stats()['hits'] == 1
+
+
+def test_lookup_caches_missing_words(client, cache, jisho_server):
+    lookups = WordLookup(JishoApiBackend(client), cache)
+
+    assert lookups.lookup('zzzz') is None
+    assert lookups.lookup('zzzz') is None
+    assert jisho_server.requests == ['zzzz']
+
+
+def test_search_results_served_from_cache(client, cache, jisho_server):
+    lookups = WordLookup(JishoApiBackend(client), cache)
+    lookups.lookup('猫')
+
+    results = lookups.search_results('猫')
+
+    assert [entry.kanji for entry in results] == ['猫', '猫舌', '猫かぶり']
+    assert jisho_server.requests == ['猫']
+
+
+def test_bench_lookup_cold(benchmark, client, tmp_path):
+    from lookup_cache import LookupCache
+
+    backend = JishoApiBackend(client)
+    counter = iter(range(10 ** 6))
+
+    def cold_lookup():
+        # A fresh cache per round keeps every lookup a miss
+        cache = LookupCache(str(tmp_path / f"cold-{next(counter)}.sqlite3"))
+        result = WordLookup(backend, cache).lookup('猫')
+        cache.close()
+        return result
+
+    assert benchmark(cold_lookup)['kanji'] == '猫'
+
+
+def test_bench_lookup_warm(benchmark, client, cache):
+    lookups = WordLookup(JishoApiBackend(client), cache)
+    lookups.lookup('猫')
+
+    assert benchmark(lookups.lookup, '猫')['kanji'] == '猫'
+
+
+def test_bench_batch_throughput(benchmark, client, tmp_path):
+    from lookup_cache import LookupCache
+
+    backend = JishoApiBackend(client)
+    words = {f"{word}-{i}": word for i in range(40) for word in WORDS}
+
+    def batch():
+        # Lookups go to the stand-in server: the cache is disabled for this run
+        results, failures = lookup_many(WordLookup(backend).lookup, words, max_workers=4)
+        assert failures == 0
+        return results
+
+    results = benchmark.pedantic(batch, rounds=3)
+    assert len(results) == len(words)
+
+
+class SlowBackend:
+    """Backend double that counts calls and takes a while to answer"""
+
+    uses_cache = False
+
+    def __init__(self):
+        self.calls = []
+
+    def lookup(self, word):
+        self.calls.append(word)
+        time.sleep(0.05)
+        return {'kanji': word}, None
+
+
+@pytest.mark.parametrize('variant, expected', [
+    ('  猫 ', '猫'),
+    ('ＡＲＩＧＡＴＯＵ', 'arigatou'),
+    ('ﾈｺ', 'ネコ'),
+    ('Tōkyō', 'toukyou'),
+    ('ohayou  gozaimasu', 'ohayou gozaimasu'),
+])
+def test_normalize_keyword(variant, expected):
+    assert normalize_keyword(variant) == expected
+
+
+def test_concurrent_lookups_share_one_request():
+    backend = SlowBackend()
+    lookups = WordLookup(backend)
+    variants = ['arigatou', 'ARIGATOU', 'ａｒｉｇａｔｏｕ', ' arigatou '] * 4
+
+    with ThreadPoolExecutor(max_workers=len(variants)) as pool:
+        results = list(pool.map(lookups.lookup, variants))
+
+    assert backend.calls == ['arigatou']
+    assert all(result == {'kanji': 'arigatou'} for result in results)
+    assert lookups.flights.in_flight() == 0
+
+
+def test_prefetch_only_fetches_latest_word():
+    backend = SlowBackend()
+    prefetcher = Prefetcher(WordLookup(backend).lookup, delay=0.05)
+
+    for partial in ['t', 'ta', 'tab', 'tabe', 'taberu']:
+        prefetcher.request(partial)
+    time.sleep(0.3)
+
+    assert backend.calls == ['taberu']
+    assert prefetcher.prefetched == 1
+
+
+def test_prefetch_cancel_drops_pending_word():
+    backend = SlowBackend()
+    prefetcher = Prefetcher(WordLookup(backend).lookup, delay=0.05)
+
+    prefetcher.request('neko')
+    prefetcher.cancel()
+    time.sleep(0.2)
+
+    assert backend.calls == []
+
+
+def test_prefetch_close_stops_thread():
+    backend = SlowBackend()
+    prefetcher = Prefetcher(WordLookup(backend).lookup, delay=0.05)
+
+    prefetcher.request('neko')
+    thread = prefetcher._thread
+    prefetcher.close()
+    thread.join(timeout=1)
+    prefetcher.request('inu')
+    time.sleep(0.1)
+
+    assert not thread.is_alive()
+    assert backend.calls == []
@@ -0,0 +1,72 @@
+"""Tests and benchmarks for jisho_parser"""
+
+import pytest
+
+from jisho_parser import JishoEntry, parse_jisho_result
+
+
+def test_parse_common_word(responses):
+    parsed = parse_jisho_result(responses['猫']['data'][0])
+
+    assert parsed['kanji'] == '猫'
+    assert parsed['reading'] == 'ねこ'
+    assert parsed['meanings'] == (
+        'cat (esp. the domestic cat, Felis catus); shamisen; geisha; wheelbarrow; clay bed-warmer'
+    )
+    assert parsed['pos'] == 'Noun'
+    assert parsed['jlpt'] == 'jlpt-n5'
+    assert parsed['common'] == 'Yes'
+
+
+def test_parse_skips_wikipedia_senses(responses):
+    parsed = parse_jisho_result(responses['こんにちは']['data'][0])
+
+    assert 'Hello' not in parsed['meanings']
+    assert 'Wikipedia definition' not in parsed['pos']
+    assert parsed['pos'] == 'Expressions (phrases, clauses, etc.), Interjection'
+
+
+def test_parse_deduplicates_parts_of_speech(responses):
+    parsed = parse_jisho_result(responses['食べる']['data'][0])
+
+    assert parsed['pos'] == 'Ichidan verb, Transitive verb'
+
+
+def test_parse_uncommon_word_without_jlpt(responses):
+    parsed = parse_jisho_result(responses['猫']['data'][2])
+
+    assert parsed['jlpt'] == ''
+    assert parsed['common'] == 'No'
+
+
+def test_lazy_entry_matches_eager_parse(raw_entries):
+    for raw in raw_entries:
+        assert JishoEntry(raw).to_dict() == parse_jisho_result(raw)
+
+
+def test_lazy_entry_defers_sense_parsing(responses):
+    entry = JishoEntry(responses['猫']['data'][0])
+
+    assert entry.kanji == '猫'
+    assert entry._meanings is None
+    assert entry.get('pos') == 'Noun'
+    assert entry._meanings is not None
+
+
+def test_lazy_entry_is_a_read_only_mapping(responses):
+    entry = JishoEntry(responses['猫']['data'][0])
+
+    assert 'reading' in entry and 'tokens' not in entry
+    assert entry['reading'] == 'ねこ'
+    assert entry.get('tokens', '') == ''
+    assert dict(entry) == entry.to_dict()
+    with pytest.raises(KeyError):
+        entry['tokens']
+
+
+def test_bench_parse_throughput(benchmark, raw_entries):
+    entries = raw_entries * 500
+
+    parsed = benchmark(lambda: [parse_jisho_result(entry) for entry in entries])
+
+    assert len(parsed) == len(entries)
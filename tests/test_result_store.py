@@ -0,0 +1,103 @@
+"""Tests and memory benchmark for the columnar result store"""
+
+import gc
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fill_index import result_hash
+from jisho_parser import RESULT_KEYS, parse_jisho_result
+from result_store import ResultStore
+
+WORDS = 50000
+
+
+@pytest.fixture(scope='module')
+def parsed(raw_entries):
+    return [parse_jisho_result(entry) for entry in raw_entries]
+
+
+def iter_results(parsed, count):
+    """Fresh results shaped like a real batch: unique words and meanings, shared POS/JLPT"""
+    for n in range(count):
+        result = dict(parsed[n % len(parsed)])
+        result['kanji'] = f"{result['kanji']}{n}"
+        result['reading'] = result['reading'] + ''.join(chr(0x3042 + int(d)) for d in str(n))
+        result['meanings'] = f"{result['meanings']}; sense {n}"
+        yield result
+
+
+def make_results(parsed, count):
+    return list(iter_results(parsed, count))
+
+
+def test_view_matches_dict(parsed):
+    store = ResultStore()
+    views = [store.add(result) for result in parsed]
+    assert len(store) == len(parsed)
+    for view, result in zip(views, parsed):
+        assert view == result
+        assert dict(view) == result == view.to_dict()
+        assert list(view) == list(RESULT_KEYS)
+        assert view.get('jlpt', '') == result['jlpt']
+        assert view.get('audio', '') == ''
+        assert dict(view, audio='[sound:x.wav]')['audio'] == '[sound:x.wav]'
+        assert result_hash(view) == result_hash(result)
+    with pytest.raises(KeyError):
+        views[0]['missing']
+
+
+def test_empty_and_non_ascii_values():
+    store = ResultStore()
+    view = store.add({'kanji': '', 'reading': 'こんにちは', 'meanings': 'hello; good day'})
+    assert view.to_dict() == {
+        'kanji': '', 'reading': 'こんにちは', 'meanings': 'hello; good day',
+        'pos': '', 'jlpt': '', 'common': 'No',
+    }
+
+
+def test_concurrent_adds(parsed):
+    store = ResultStore()
+    results = make_results(parsed, 2000)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        views = list(pool.map(store.add, results))
+    assert [view.to_dict() for view in views] == results
+
+
+def allocated(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def test_bench_memory(benchmark, parsed):
+    # Results arrive as freshly parsed dicts either way; what differs is what is kept
+    def as_dicts():
+        return {n: result for n, result in enumerate(iter_results(parsed, WORDS))}
+
+    def as_store():
+        store = ResultStore()
+        return {n: store.add(result) for n, result in enumerate(iter_results(parsed, WORDS))}
+
+    dict_bytes = allocated(as_dicts)
+    store_bytes = allocated(as_store)
+    benchmark.extra_info.update({
+        'words': WORDS,
+        'dict_bytes': dict_bytes,
+        'store_bytes': store_bytes,
+        'ratio': store_bytes / dict_bytes,
+    })
+    print(f"{WORDS} results: dicts {dict_bytes / 1e6:.1f} MB, store {store_bytes / 1e6:.1f} MB")
+    assert store_bytes < dict_bytes * 0.6
+
+    store = ResultStore()
+    views = [store.add(result) for result in iter_results(parsed, 1000)]
+    benchmark(lambda: [view.get('meanings', '') for view in views])
@@ -0,0 +1,130 @@
+"""Tests for the priority scheduler in front of the Jisho.org rate limit"""
+
+import threading
+import time
+
+import pytest
+
+from scheduler import BULK, INTERACTIVE, PREFETCH, PriorityScheduler, current_priority, priority, with_priority
+
+
+def wait_for_queue(scheduler, name, depth):
+    deadline = time.monotonic() + 2
+    while scheduler.queue_depths()[name][0] < depth:
+        assert time.monotonic() < deadline, f"{name} queue never reached {depth}"
+        time.sleep(0.001)
+
+
+def start_waiters(scheduler, name, jobs, granted):
+    """Start one thread per job id, each acquiring once, queued in list order"""
+    threads = []
+    for depth, job in enumerate(jobs, 1):
+        def run(job=job):
+            with priority(name, job):
+                scheduler.acquire()
+            granted.append((name, job))
+        thread = threading.Thread(target=run)
+        thread.start()
+        threads.append(thread)
+        wait_for_queue(scheduler, name, depth)
+    return threads
+
+
+def drained(rate=20, burst=1, **kwargs):
+    """A scheduler whose bucket has just been emptied"""
+    scheduler = PriorityScheduler(rate, burst, **kwargs)
+    for _ in range(burst):
+        scheduler.acquire()
+    return scheduler
+
+
+def test_priority_context():
+    assert current_priority() == (INTERACTIVE, None)
+    with priority(BULK, 'job-1'):
+        assert current_priority() == (BULK, 'job-1')
+        with priority(PREFETCH):
+            assert current_priority() == (PREFETCH, None)
+        assert current_priority() == (BULK, 'job-1')
+    assert current_priority() == (INTERACTIVE, None)
+    assert with_priority(current_priority, BULK, 'job-2')() == (BULK, 'job-2')
+    with pytest.raises(ValueError):
+        with priority('urgent'):
+            pass
+
+
+def test_requests_are_granted_by_class():
+    scheduler = drained(interactive_reserve=0)
+    granted = []
+
+    threads = start_waiters(scheduler, BULK, ['a', 'a'], granted)
+    threads += start_waiters(scheduler, PREFETCH, [None], granted)
+    threads += start_waiters(scheduler, INTERACTIVE, [None], granted)
+    for thread in threads:
+        thread.join()
+
+    assert [name for name, _ in granted] == [INTERACTIVE, PREFETCH, BULK, BULK]
+    assert scheduler.queue_depths()[BULK] == (0, 2)
+
+
+def test_interactive_requests_borrow_beyond_the_limit():
+    scheduler = drained(rate=1, interactive_reserve=2)
+
+    started = time.perf_counter()
+    scheduler.acquire()
+    scheduler.acquire()
+    assert time.perf_counter() - started < 0.1
+    assert scheduler.tokens < -0.9
+
+
+@pytest.mark.parametrize('fairness, expected', [
+    ('round_robin', ['a', 'b', 'a', 'b', 'a', 'b']),
+    ('fifo', ['a', 'a', 'a', 'b', 'b', 'b']),
+])
+def test_fairness_between_jobs(fairness, expected):
+    scheduler = drained(fairness=fairness)
+    granted = []
+
+    # Job "b" queues up behind all of job "a"'s requests
+    threads = start_waiters(scheduler, BULK, ['a', 'a', 'a', 'b', 'b', 'b'], granted)
+    for thread in threads:
+        thread.join()
+
+    assert [job for _, job in granted] == expected
+
+
+def test_interactive_requests_overtake_a_running_batch(client, jisho_server):
+    scheduler = client.rate_limiter = PriorityScheduler(20, 1, interactive_reserve=1)
+    acquire = scheduler.acquire
+    # Bulk requests still waiting each time an interactive request is granted
+    overtaken = []
+
+    def recording_acquire():
+        acquire()
+        if current_priority()[0] == INTERACTIVE:
+            overtaken.append(scheduler.queue_depths()[BULK][0])
+
+    scheduler.acquire = recording_acquire
+    stop = threading.Event()
+
+    def batch_worker(worker):
+        with priority(BULK, 'batch'):
+            count = 0
+            while not stop.is_set():
+                client.search(f"bulk-{worker}-{count}")
+                count += 1
+
+    workers = [threading.Thread(target=batch_worker, args=(i,)) for i in range(8)]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in range(5):
+            wait_for_queue(scheduler, BULK, 6)
+            client.search('猫')
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+
+    assert len(overtaken) == 5
+    assert all(waiting > 0 for waiting in overtaken)
+    assert sum(1 for keyword in jisho_server.requests if keyword == '猫') == 5
@@ -0,0 +1,128 @@
+"""Tests and benchmarks for lookup cache snapshots"""
+
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+from lookup_cache import LookupCache
+
+
+def test_round_trip(filled_cache, tmp_path):
+    snapshot = str(tmp_path / 'snapshot.jsonl.gz')
+    assert filled_cache.export_snapshot(snapshot) == filled_cache.stats()['entries']
+
+    fresh = LookupCache(str(tmp_path / 'fresh.sqlite3'))
+    imported, skipped = fresh.import_snapshot(snapshot)
+    assert (imported, skipped) == (filled_cache.stats()['entries'], 0)
+    for keyword in ('猫', 'arigatou', 'zzzz'):
+        assert fresh.get(keyword) == filled_cache.get(keyword)
+    assert fresh.get_entries('食べる') == filled_cache.get_entries('食べる')
+    # The word index comes along, so suggestions work without re-parsing
+    assert [word['kanji'] for word in fresh.suggest('ねこ')] == ['猫', '猫舌', '猫かぶり']
+    fresh.close()
+
+
+def test_snapshot_header(filled_cache, tmp_path):
+    snapshot = tmp_path / 'snapshot.jsonl.gz'
+    filled_cache.export_snapshot(str(snapshot))
+    with gzip.open(snapshot, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    assert header['format'] == 'anki-jisho-import/lookup-cache'
+    assert header['version'] == 1
+    assert header['lookups'] == filled_cache.stats()['entries']
+
+
+def test_merge_keeps_newer_entries(tmp_path):
+    snapshot = str(tmp_path / 'snapshot.jsonl.gz')
+    shared = LookupCache(str(tmp_path / 'shared.sqlite3'))
+    shared.put('猫', {'kanji': '猫', 'meanings': 'old'})
+    shared.put('犬', {'kanji': '犬', 'meanings': 'shared'})
+    shared.export_snapshot(snapshot)
+    shared.close()
+
+    time.sleep(0.01)
+    local = LookupCache(str(tmp_path / 'local.sqlite3'))
+    local.put('猫', {'kanji': '猫', 'meanings': 'new'})
+    assert local.import_snapshot(snapshot) == (1, 1)
+    assert local.get('猫')[1]['meanings'] == 'new'
+    assert local.get('犬')[1]['meanings'] == 'shared'
+    assert local.stats()['entries'] == 2
+    local.close()
+
+
+def test_expired_entries_are_skipped(tmp_path, monkeypatch):
+    snapshot = str(tmp_path / 'snapshot.jsonl.gz')
+    old = LookupCache(str(tmp_path / 'old.sqlite3'))
+    old.put('猫', {'kanji': '猫'})
+    old.export_snapshot(snapshot)
+    old.close()
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 40 * 86400)
+    cache = LookupCache(str(tmp_path / 'new.sqlite3'), ttl_days=30)
+    assert cache.import_snapshot(snapshot) == (0, 1)
+    cache.close()
+
+
+def test_lookups_are_served_during_import(filled_cache, tmp_path):
+    snapshot = str(tmp_path / 'snapshot.jsonl.gz')
+    filled_cache.export_snapshot(snapshot)
+    served = []
+
+    def progress(rows):
+        # Runs while rows are staged; a lookup from another thread must not wait for the import
+        reader = threading.Thread(target=lambda: served.append(filled_cache.get('猫')))
+        reader.start()
+        reader.join(timeout=1)
+        assert not reader.is_alive()
+
+    filled_cache.import_snapshot(snapshot, progress=progress)
+    assert served and served[0] is not None
+
+
+def test_rejects_other_files(cache, tmp_path):
+    bogus = tmp_path / 'bogus.jsonl.gz'
+    with gzip.open(bogus, 'wt', encoding='utf-8') as f:
+        f.write('{"format": "something-else"}\n')
+    with pytest.raises(ValueError):
+        cache.import_snapshot(str(bogus))
+
+    newer = tmp_path / 'newer.jsonl.gz'
+    with gzip.open(newer, 'wt', encoding='utf-8') as f:
+        f.write('{"format": "anki-jisho-import/lookup-cache", "version": 99}\n')
+    with pytest.raises(ValueError):
+        cache.import_snapshot(str(newer))
+
+
+def test_bench_import_100k(benchmark, tmp_path, raw_entries):
+    # 100k lookups with their first result and one indexed word each
+    source = LookupCache(str(tmp_path / 'source.sqlite3'), max_entries=0)
+    conn = source._connect()
+    now = time.time()
+    entry = json.dumps(raw_entries[0], ensure_ascii=False)
+    result = json.dumps({'kanji': '猫', 'reading': 'ねこ', 'jlpt': 'jlpt-n5', 'common': 'Yes'}, ensure_ascii=False)
+    conn.executemany(
+        "INSERT INTO lookups VALUES (?, ?, ?, ?, ?)",
+        ((f"word{n}", result, f"[{entry}]", now, now) for n in range(100000)),
+    )
+    conn.executemany(
+        "INSERT INTO words VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((f"猫{n}", 'ねこ', 'ねこ', 'neko', 1, f"word{n}", result) for n in range(100000)),
+    )
+    conn.commit()
+    snapshot = str(tmp_path / 'snapshot.jsonl.gz')
+    source.export_snapshot(snapshot)
+    source.close()
+
+    counter = iter(range(1000))
+
+    def warm_fresh_install():
+        cache = LookupCache(str(tmp_path / f"fresh-{next(counter)}.sqlite3"), max_entries=0)
+        counts = cache.import_snapshot(snapshot)
+        cache.close()
+        return counts
+
+    assert benchmark.pedantic(warm_fresh_install, rounds=1) == (100000, 0)
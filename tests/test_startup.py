@@ -0,0 +1,73 @@
+"""Checks that loading the add-on stays cheap
+
+main.py and batch.py need Anki, so the test imports the add-on modules
+they load at startup (their module-level relative imports) in a fresh
+interpreter and measures that.
+"""
+
+import ast
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Only loaded on the first lookup, never at startup
+DEFERRED = (
+    'requests',
+    'urllib3',
+    'sqlite3',
+    'orjson',
+    'hashlib',
+    'jisho_client',
+    'backends',
+    'lookup',
+    'lookup_cache',
+    'jisho_parser',
+    'jmdict',
+    'fill_index',
+    'audio',
+    'word_attributes',
+    'result_store',
+    'tokenizer',
+    'scheduler',
+)
+
+# Import cost budget in milliseconds for everything loaded at startup
+BUDGET_MS = 50
+
+
+def startup_modules():
+    """Local modules imported at module level by the Anki entry points"""
+    modules = set()
+    for name in ('main.py', 'batch.py'):
+        with open(os.path.join(ROOT, name), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom) and node.level == 1 and node.module not in ('main', 'batch'):
+                modules.add(node.module)
+    return sorted(modules)
+
+
+def measure_imports(modules):
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        f"for name in {modules!r}:\n"
+        "    __import__(name)\n"
+        "elapsed = (time.perf_counter() - started) * 1000\n"
+        "print(json.dumps({'ms': elapsed, 'loaded': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def test_startup_imports_are_light():
+    modules = startup_modules()
+    assert 'config_store' in modules
+    measured = measure_imports(modules)
+    assert not set(DEFERRED) & set(measured['loaded'])
+    assert measured['ms'] < BUDGET_MS
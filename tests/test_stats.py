@@ -0,0 +1,58 @@
+"""Tests for the lookup instrumentation"""
+
+import json
+
+from backends import JishoApiBackend
+from lookup import WordLookup
+from stats import NULL_TIMER, Stats, percentile, stats
+
+
+def test_percentile_nearest_rank():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 0.50) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_disabled_stats_record_nothing():
+    collector = Stats()
+    assert collector.timer('lookup') is NULL_TIMER
+    collector.record('lookup', 1.0)
+    collector.count('cache_hits')
+    assert collector.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_snapshot_and_export():
+    collector = Stats(enabled=True)
+    for ms in (1, 2, 3, 4):
+        collector.record('parse', ms / 1000)
+    collector.count('cache_hits', 2)
+
+    snapshot = json.loads(collector.to_json())
+    assert snapshot['stages']['parse']['count'] == 4
+    assert snapshot['stages']['parse']['max_ms'] == 4.0
+    assert snapshot['counters'] == {'cache_hits': 2}
+    assert 'parse' in collector.format_table()
+
+    collector.reset()
+    assert collector.snapshot() == {'stages': {}, 'counters': {}}
+
+
+def test_lookup_stages_recorded(client, cache):
+    lookups = WordLookup(JishoApiBackend(client), cache)
+    stats.reset()
+    stats.enabled = True
+    try:
+        lookups.lookup('猫')
+        lookups.lookup('猫')
+        snapshot = stats.snapshot()
+    finally:
+        stats.enabled = False
+        stats.reset()
+
+    assert snapshot['counters']['cache_misses'] == 1
+    assert snapshot['counters']['cache_hits'] == 1
+    assert snapshot['counters']['http_requests'] == 1
+    for stage in ('lookup', 'cache_check', 'http_request', 'http_headers', 'json_decode', 'parse'):
+        assert stage in snapshot['stages']
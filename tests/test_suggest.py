@@ -0,0 +1,110 @@
+"""Tests and benchmarks for the kana helpers and local prefix suggestions"""
+
+import sqlite3
+import time
+
+import pytest
+
+from backends import JishoApiBackend
+from kana import is_kana, kana_to_romaji, to_hiragana
+from lookup import WordLookup
+from lookup_cache import LookupCache
+
+
+@pytest.mark.parametrize('kana, romaji', [
+    ('ねこ', 'neko'),
+    ('とうきょう', 'toukyou'),
+    ('がっこう', 'gakkou'),
+    ('まっちゃ', 'matcha'),
+    ('コーヒー', 'koohii'),
+    ('こんにちは', 'konnichiha'),
+])
+def test_kana_to_romaji(kana, romaji):
+    assert kana_to_romaji(kana) == romaji
+
+
+def test_kana_folding():
+    assert to_hiragana('ネコ') == 'ねこ'
+    assert is_kana('ねこ') and is_kana('コーヒー')
+    assert not is_kana('猫') and not is_kana('neko')
+
+
+@pytest.mark.parametrize('prefix, expected', [
+    ('猫', ['猫', '猫舌', '猫かぶり']),
+    ('ねこ', ['猫', '猫舌', '猫かぶり']),
+    ('ネコ', ['猫', '猫舌', '猫かぶり']),
+    ('tabe', ['食べる', '食べ物']),
+    ('ＮＥＫＯＪ', ['猫舌']),
+    ('食べ', ['食べる', '食べ物']),
+    ('xyz', []),
+])
+def test_suggest_prefix(filled_cache, prefix, expected):
+    assert [word['kanji'] for word in filled_cache.suggest(prefix)] == expected
+
+
+def test_suggest_ranks_exact_and_common_first(filled_cache):
+    # ねこかぶり sorts before ねこじた but is not a common word
+    assert [word['reading'] for word in filled_cache.suggest('ねこ', limit=2)] == ['ねこ', 'ねこじた']
+
+
+def test_suggest_without_network(filled_cache, jisho_server):
+    requests_before = len(jisho_server.requests)
+    assert filled_cache.suggest('うつく')[0]['meanings']
+    assert len(jisho_server.requests) == requests_before
+
+
+def test_words_follow_eviction(client, tmp_path):
+    cache = LookupCache(str(tmp_path / 'small.sqlite3'), max_entries=1)
+    lookups = WordLookup(JishoApiBackend(client), cache)
+    lookups.lookup('猫')
+    lookups.lookup('食べる')
+    assert cache.suggest('ねこ') == []
+    assert cache.suggest('たべ')
+    cache.clear()
+    assert cache.suggest('たべ') == []
+    cache.close()
+
+
+def test_existing_cache_is_indexed_on_upgrade(client, tmp_path, raw_entries):
+    path = str(tmp_path / 'old.sqlite3')
+    cache = LookupCache(path)
+    WordLookup(JishoApiBackend(client), cache).lookup('猫')
+    cache.close()
+
+    # Simulate a cache written before the word index existed
+    conn = sqlite3.connect(path)
+    conn.execute("DROP TABLE words")
+    conn.commit()
+    conn.close()
+
+    cache = LookupCache(path)
+    # Indexing runs in the background; until it is done nothing is suggested
+    assert cache.suggest('neko') == []
+    cache.build_word_index()
+    assert [word['kanji'] for word in cache.suggest('neko')] == ['猫', '猫舌', '猫かぶり']
+    cache.close()
+
+    # The upgrade is remembered
+    cache = LookupCache(path)
+    assert cache.suggest('neko')
+    cache.close()
+
+
+def test_suggest_does_not_wait_for_a_busy_cache(filled_cache):
+    with filled_cache._lock:
+        started = time.perf_counter()
+        assert filled_cache.suggest('ねこ') == []
+        assert time.perf_counter() - started < 0.5
+    assert filled_cache.suggest('ねこ')
+
+
+def test_bench_suggest(benchmark, cache, raw_entries):
+    # Stand-in for a large personal cache: many keywords, each with several words
+    for n in range(2000):
+        entries = []
+        for entry in raw_entries:
+            entry = dict(entry, slug=f"{entry['slug']}{n}")
+            entries.append(entry)
+        cache.put(f"word-{n}", None, entries)
+
+    assert benchmark(cache.suggest, 'ねこ')
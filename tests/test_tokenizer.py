@@ -0,0 +1,108 @@
+"""Tests for splitting multi-word fields and looking the words up per token"""
+
+import time
+
+import pytest
+
+from backends import JishoApiBackend
+from lookup import WordLookup
+from tokenizer import ANALYZERS, SimpleTokenizer, create_tokenizer, lookup_tokens, merge_token_results
+
+
+class SlowBackend:
+    """Backend double that takes as long as a network round trip to answer"""
+
+    uses_cache = False
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.calls = []
+
+    def lookup(self, word):
+        self.calls.append(word)
+        time.sleep(self.delay)
+        if word == 'missing':
+            return None, None
+        if word == 'broken':
+            raise ConnectionError("unreachable")
+        return {'kanji': word, 'reading': f"{word}-reading", 'meanings': f"{word}-meaning"}, None
+
+
+def test_simple_tokenizer_splits_lists():
+    tokenizer = SimpleTokenizer()
+
+    assert tokenizer.lemmas('猫、犬・鳥 猫') == ['猫', '犬', '鳥']
+    assert tokenizer.lemmas(' 食べる。') == ['食べる']
+    assert tokenizer.lemmas('') == []
+
+
+def test_create_tokenizer():
+    assert create_tokenizer('simple').name == 'simple'
+    assert create_tokenizer('auto').name in ('sudachi', 'fugashi', 'simple')
+    assert create_tokenizer('nonsense').name == 'simple'
+
+
+def test_missing_analyzer_falls_back_to_simple(monkeypatch):
+    class MissingAnalyzer(SimpleTokenizer):
+        def __init__(self):
+            raise ImportError("No module named 'sudachipy'")
+
+    monkeypatch.setitem(ANALYZERS, 'sudachi', MissingAnalyzer)
+
+    tokenizer = create_tokenizer('sudachi')
+    assert tokenizer.name == 'simple'
+    assert tokenizer.lemmas('猫') == ['猫']
+
+
+def test_tokens_are_looked_up_concurrently():
+    backend = SlowBackend(delay=0.1)
+    tokens = [f"word{i}" for i in range(20)]
+
+    started = time.perf_counter()
+    results = lookup_tokens(WordLookup(backend).lookup, tokens, max_workers=20)
+    elapsed = time.perf_counter() - started
+
+    assert [result['kanji'] for result in results] == tokens
+    assert sorted(backend.calls) == sorted(tokens)
+    # Twenty serial lookups would take two seconds
+    assert elapsed < 0.5
+
+
+def test_failed_tokens_count_as_not_found():
+    lookup = WordLookup(SlowBackend(delay=0)).lookup
+
+    results = lookup_tokens(lookup, ['猫', 'broken', 'missing'])
+
+    assert results[0]['kanji'] == '猫'
+    assert results[1:] == [None, None]
+    with pytest.raises(ConnectionError):
+        lookup_tokens(lookup, ['broken', 'broken'])
+
+
+def test_merge_token_results():
+    results = [
+        {'kanji': '猫', 'reading': 'ねこ', 'meanings': 'cat'},
+        None,
+        {'kanji': '食べる', 'reading': 'たべる', 'meanings': 'to eat'},
+    ]
+
+    merged = merge_token_results(['猫', 'ほげ', '食べる'], results, separator='\n')
+
+    assert merged == {
+        'tokens': '猫\nほげ\n食べる',
+        'token_readings': 'ねこ\n\nたべる',
+        'token_meanings': '猫: cat\nほげ\n食べる: to eat',
+    }
+    assert merge_token_results(['ほげ'], [None]) is None
+
+
+def test_token_lookups_go_through_the_cache(client, cache, jisho_server):
+    lookup = WordLookup(JishoApiBackend(client), cache).lookup
+    tokens = SimpleTokenizer().lemmas('猫、食べる')
+
+    first = merge_token_results(tokens, lookup_tokens(lookup, tokens))
+    second = merge_token_results(tokens, lookup_tokens(lookup, tokens))
+
+    assert first == second
+    assert first['token_readings'] == 'ねこ<br>たべる'
+    assert sorted(jisho_server.requests) == sorted(tokens)
@@ -0,0 +1,91 @@
+"""Tests and benchmarks for deck-wide JLPT/common resolution and tagging"""
+
+import pytest
+
+from jmdict import JMdictBackend, build_index
+from word_attributes import jlpt_tag, resolve_attributes, update_tags
+
+JMDICT_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<JMdict>
+<entry><ent_seq>1</ent_seq>
+<k_ele><keb>猫</keb><ke_pri>ichi1</ke_pri></k_ele>
+<r_ele><reb>ねこ</reb></r_ele>
+<sense><pos>noun (common) (futsuumeishi)</pos><gloss>cat</gloss></sense>
+</entry>
+<entry><ent_seq>2</ent_seq>
+<k_ele><keb>鶏</keb></k_ele>
+<r_ele><reb>にわとり</reb></r_ele>
+<sense><pos>noun (common) (futsuumeishi)</pos><gloss>chicken</gloss></sense>
+</entry>
+<entry><ent_seq>3</ent_seq>
+<k_ele><keb>犬</keb><ke_pri>news1</ke_pri></k_ele>
+<r_ele><reb>いぬ</reb></r_ele>
+<sense><pos>noun (common) (futsuumeishi)</pos><gloss>dog</gloss></sense>
+</entry>
+</JMdict>
+"""
+
+
+@pytest.fixture
+def jmdict(tmp_path):
+    xml_path = tmp_path / 'JMdict_e.xml'
+    xml_path.write_text(JMDICT_XML, encoding='utf-8')
+    db_path = str(tmp_path / 'jmdict.sqlite3')
+    build_index(str(xml_path), db_path)
+    backend = JMdictBackend(db_path)
+    yield backend
+    backend.close()
+
+
+def test_jlpt_tag():
+    assert jlpt_tag('jlpt-n5') == 'JLPT::N5'
+    assert jlpt_tag('jlpt-n1', prefix='jlpt_') == 'jlpt_N1'
+    assert jlpt_tag('') is None
+
+
+@pytest.mark.parametrize('tags, jlpt, common, expected', [
+    (['vocab'], 'jlpt-n5', True, ['vocab', 'JLPT::N5', 'common']),
+    (['vocab', 'JLPT::N4', 'common'], 'jlpt-n5', False, ['vocab', 'JLPT::N5']),
+    (['JLPT::N5', 'common'], 'jlpt-n5', True, None),
+    (['jlpt::n5', 'Common'], 'jlpt-n5', True, None),
+    (['vocab'], '', False, None),
+    # An unknown level keeps the note's existing JLPT tags
+    (['vocab', 'JLPT::N3'], '', True, ['vocab', 'JLPT::N3', 'common']),
+    (['JLPT::N3', 'common'], '', False, ['JLPT::N3']),
+])
+def test_update_tags(tags, jlpt, common, expected):
+    assert update_tags(tags, jlpt, common) == expected
+
+
+def test_cache_attributes(filled_cache):
+    found = filled_cache.attributes(['猫', 'ねこじた', 'ネコ', 'arigatou', '有り難う', 'zzzz', '鶏'])
+    assert found['猫'] == ('jlpt-n5', True)
+    assert found['ねこじた'][1] is True
+    # Katakana input matches the hiragana reading
+    assert found['ネコ'] == ('jlpt-n5', True)
+    # A cached romaji lookup resolves to the result it returned
+    assert found['arigatou'] == found['有り難う']
+    assert 'zzzz' not in found and '鶏' not in found
+
+
+def test_jmdict_attributes(jmdict):
+    assert jmdict.attributes(['猫', 'にわとり', 'いぬ', '象']) == {
+        '猫': ('', True), 'にわとり': ('', False), 'いぬ': ('', True),
+    }
+
+
+def test_earlier_sources_win(filled_cache, jmdict):
+    found = resolve_attributes(['猫', '鶏', '象'], [filled_cache, jmdict])
+    # JLPT level from the cache, the dictionary only fills in the missing word
+    assert found == {'猫': ('jlpt-n5', True), '鶏': ('', False)}
+
+
+def test_bench_resolve_deck(benchmark, cache, raw_entries):
+    # A 30k-note deck whose words come from 1500 cached responses
+    for n in range(1500):
+        cache.put(f"word-{n}", None, [dict(entry, slug=f"{entry['slug']}{n}") for entry in raw_entries])
+    keys = [f"{entry['slug']}{n}" for n in range(1500) for entry in raw_entries] * 3
+    keys = keys[:30000]
+
+    found = benchmark.pedantic(resolve_attributes, args=(keys, [cache]), rounds=3)
+    assert len(found) == len(set(keys))
@@ -0,0 +1,160 @@
+"""
+Splits multi-word field content into dictionary words
+Sentences and compounds are segmented into lemmas by a morphological
+analyzer (SudachiPy or fugashi, if installed), each lemma is looked up
+concurrently and the results are merged into per-token fields
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .scheduler import current_priority, with_priority
+except ImportError:
+    from scheduler import current_priority, with_priority
+
+# Parts of speech that are never looked up on their own (particles,
+# auxiliary verbs, punctuation and whitespace); SudachiDict and UniDic
+# share these names
+SKIPPED_POS = ('助詞', '助動詞', '補助記号', '記号', '空白')
+
+# Separators between the words of a list-like field
+_SEPARATORS_RE = re.compile(r'[\s、。，．,.・/／;；:：!！?？「」『』（）()\[\]【】]+')
+
+
+class Tokenizer:
+    """Base class for analyzers"""
+
+    name = None
+
+    def __init__(self):
+        # Analyzer instances are not safe to share between threads
+        self._lock = threading.Lock()
+
+    def lemmas(self, text):
+        """Return the distinct content words of text in dictionary form, in order"""
+        with self._lock:
+            words = list(self._lemmas(text))
+        return list(dict.fromkeys(word for word in words if word))
+
+    def _lemmas(self, text):
+        raise NotImplementedError
+
+
+class SimpleTokenizer(Tokenizer):
+    """Splits on whitespace and punctuation only; needs no dictionary"""
+
+    name = 'simple'
+
+    def _lemmas(self, text):
+        return _SEPARATORS_RE.split(text)
+
+
+class SudachiTokenizer(Tokenizer):
+    """SudachiPy with its installed system dictionary, in the longest split mode"""
+
+    name = 'sudachi'
+
+    def __init__(self):
+        super().__init__()
+        from sudachipy import Dictionary, SplitMode
+        self._tokenizer = Dictionary().create(mode=SplitMode.C)
+
+    def _lemmas(self, text):
+        for morpheme in self._tokenizer.tokenize(text):
+            if morpheme.part_of_speech()[0] not in SKIPPED_POS:
+                yield morpheme.dictionary_form()
+
+
+class FugashiTokenizer(Tokenizer):
+    """fugashi (MeCab) with its installed UniDic dictionary"""
+
+    name = 'fugashi'
+
+    def __init__(self):
+        super().__init__()
+        import fugashi
+        self._tagger = fugashi.Tagger()
+
+    def _lemmas(self, text):
+        for word in self._tagger(text):
+            if word.feature.pos1 in SKIPPED_POS:
+                continue
+            # UniDic lemmas of loanwords carry the source word: コーヒー-coffee
+            lemma = word.feature.lemma
+            yield lemma.split('-')[0] if lemma else word.surface
+
+
+ANALYZERS = {
+    'sudachi': SudachiTokenizer,
+    'fugashi': FugashiTokenizer,
+    'simple': SimpleTokenizer,
+}
+
+
+def create_tokenizer(analyzer='auto'):
+    """Build the named analyzer; "auto" picks the first one that is installed
+
+    An unknown name, or an analyzer whose package or dictionary is not
+    installed, falls back to the simple splitter with a printed error.
+    """
+    if analyzer == 'auto':
+        for name in ('sudachi', 'fugashi'):
+            try:
+                return ANALYZERS[name]()
+            except Exception:
+                continue
+        return SimpleTokenizer()
+    if analyzer not in ANALYZERS:
+        print(f"Unknown analyzer '{analyzer}', falling back to simple splitting")
+        return SimpleTokenizer()
+    try:
+        return ANALYZERS[analyzer]()
+    except Exception as e:
+        print(f"Could not load the {analyzer} analyzer ({e}), falling back to simple splitting")
+        return SimpleTokenizer()
+
+
+def lookup_tokens(lookup, tokens, max_workers=8):
+    """Look every token up concurrently and return the results in token order
+
+    Failed lookups count as not found; if every lookup fails the first
+    error is raised. The lookups run at the caller's priority.
+    """
+    if not tokens:
+        return []
+    lookup = with_priority(lookup, *current_priority())
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tokens)))) as pool:
+        futures = [pool.submit(lookup, token) for token in tokens]
+    results = []
+    errors = []
+    for token, future in zip(tokens, futures):
+        error = future.exception()
+        if error is not None:
+            print(f"Error looking up {token}: {error}")
+            errors.append(error)
+        results.append(None if error is not None else future.result())
+    if errors and len(errors) == len(tokens):
+        raise errors[0]
+    return results
+
+
+def merge_token_results(tokens, results, separator='<br>'):
+    """Merge per-token results into the token fields, one line per token
+
+    Returns None when no token was found.
+    """
+    if not any(results):
+        return None
+    words, readings, meanings = [], [], []
+    for token, result in zip(tokens, results):
+        word = (result.get('kanji') if result else None) or token
+        words.append(word)
+        readings.append(result.get('reading', '') if result else '')
+        meanings.append(f"{word}: {result.get('meanings', '')}" if result else word)
+    return {
+        'tokens': separator.join(words),
+        'token_readings': separator.join(readings),
+        'token_meanings': separator.join(meanings),
+    }
@@ -0,0 +1,56 @@
+"""
+JLPT level and commonness of many words at once
+Resolves words against local data only (the lookup cache and the
+offline dictionary) and turns the results into Anki tags
+"""
+
+DEFAULT_JLPT_PREFIX = "JLPT::"
+DEFAULT_COMMON_TAG = "common"
+
+
+def resolve_attributes(keys, sources):
+    """Return {key: (jlpt, common)} from sources with an attributes(keys) method
+
+    Earlier sources win; later ones only fill in keys still missing.
+    """
+    keys = set(keys)
+    resolved = {}
+    for source in sources:
+        missing = keys - resolved.keys()
+        if not missing:
+            break
+        for key, attributes in source.attributes(missing).items():
+            resolved.setdefault(key, attributes)
+    return resolved
+
+
+def jlpt_tag(jlpt, prefix=DEFAULT_JLPT_PREFIX):
+    """Turn a Jisho.org level such as "jlpt-n5" into a tag such as "JLPT::N5" """
+    if not jlpt:
+        return None
+    return prefix + jlpt.lower().replace('jlpt-', '').upper()
+
+
+def update_tags(tags, jlpt, common, prefix=DEFAULT_JLPT_PREFIX, common_tag=DEFAULT_COMMON_TAG):
+    """Return the note's tags with its JLPT and common tags replaced, or None if unchanged
+
+    Tags from an earlier run (any tag starting with prefix, and
+    common_tag) are removed first, so a changed level never leaves two
+    JLPT tags behind. When the level is unknown (the offline dictionary
+    has none) the existing JLPT tags are kept.
+    """
+    level = jlpt_tag(jlpt, prefix)
+    lowered_prefix = prefix.lower() if level else None
+    lowered_common = common_tag.lower() if common_tag else None
+    kept = [
+        tag for tag in tags
+        if not (lowered_prefix and tag.lower().startswith(lowered_prefix))
+        and tag.lower() != lowered_common
+    ]
+    if level:
+        kept.append(level)
+    if common and common_tag:
+        kept.append(common_tag)
+    if sorted(tag.lower() for tag in kept) == sorted(tag.lower() for tag in tags):
+        return None
+    return kept